@@ -1,22 +1,33 @@
 import pdfplumber
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# PyMuPDF is optional; it reads raw page text without pdfminer's layout analysis
+try:
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+def first_page_text(path):
+    if PYMUPDF_AVAILABLE:
+        with pymupdf.open(path) as doc:
+            return doc[0].get_text("text")
+    # Only page 1 is needed, so don't load the rest of the document's pages
+    with pdfplumber.open(path, pages=[1]) as pdf:
+        return pdf.pages[0].extract_text()
 
 def check_pdf(path):
+    # Build the report as one string so output from parallel workers doesn't interleave
     try:
-        with pdfplumber.open(path) as pdf:
-            text = pdf.pages[0].extract_text()
-            if text:
-                print(f"File: {path}")
-                print("Text extracted successfully:")
-                print(text[:500])
-                return True
-            else:
-                print(f"File: {path}")
-                print("No text extracted (likely image-based).")
-                return False
+        text = first_page_text(path)
+        if text:
+            return True, f"File: {path}\nText extracted successfully:\n{text[:500]}"
+        else:
+            return False, f"File: {path}\nNo text extracted (likely image-based)."
     except Exception as e:
-        print(f"Error checking {path}: {e}")
-        return False
+        return False, f"Error checking {path}: {e}"
 
 files = [
     "tn_elections_2016/raw_data/Ac036.pdf",
@@ -25,6 +36,11 @@ files = [
     "tn_elections_2016/raw_data/Ac028.pdf"
 ]
 
-for f in files:
-    check_pdf(f)
-    print("-" * 40)
+def main():
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for ok, report in ex.map(check_pdf, files):
+            print(report)
+            print("-" * 40)
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,83 @@
 import pandas as pd
+import numpy as np
 import json
-import re
 import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
-def get_booth_num(booth_cell):
+
+# orjson is optional and much faster; the json fallback writes the same indented JSON,
+# except that orjson writes NaN/Infinity as null
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def load_json(path):
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def dump_json(obj, path):
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+
+def get_booth_nums(booth_cells):
     # Extract digit from booth cell (e.g. "5 (M)" -> 5, "5 A" -> 5, "5" -> 5)
-    match = re.search(r'(\d+)', str(booth_cell))
-    if match:
-        return int(match.group(1))
-    return None
+    # Vectorized over the whole column; nullable Int64 keeps <NA> for cells without a digit
+    return booth_cells.astype(str).str.extract(r'(\d+)', expand=False).astype('Int64')
+
+def read_vote_csv(path):
+    # The C parser already types clean candidate_* columns as int/float in the same pass,
+    # so only columns that came back as text need the slower pd.to_numeric coercion
+    df = pd.read_csv(path)
+    cand_cols = [c for c in df.columns if c.startswith('candidate_')]
+    text_cols = [c for c in cand_cols if not pd.api.types.is_numeric_dtype(df[c])]
+    if text_cols:
+        df[text_cols] = df[text_cols].apply(pd.to_numeric, errors='coerce')
+    df[cand_cols] = df[cand_cols].fillna(0)
+    return df
 
 def analyze_constituency(ac_id, mapping, dir_2016, dir_2021):
     print(f"Analyzing {ac_id} - {mapping['name']}...")
     
     # Load 2016 Data
     f_2016 = dir_2016 / f"Ac{ac_id[2:]}.csv"
-    df_2016 = pd.read_csv(f_2016)
+    df_2016 = read_vote_csv(f_2016)
     
     # Load 2021 Data
     files_2021 = list(dir_2021.glob(f"{ac_id}*.csv"))
     if not files_2021:
         print(f"  Error: 2021 file not found for {ac_id}")
         return None
-    df_2021 = pd.read_csv(files_2021[0])
+    df_2021 = read_vote_csv(files_2021[0])
     
     # Clean 2016 Data
-    df_2016['booth_no'] = df_2016['polling_station_no'].apply(get_booth_num)
+    df_2016['booth_no'] = get_booth_nums(df_2016['polling_station_no'])
     
     # Identify Candidate Columns for 2016
     cand_cols_16 = [c for c in df_2016.columns if c.startswith('candidate_')]
     
     # Aggregate 2016 (some booths might have multiple entries due to PDF parsing)
-    agg_16 = {c: 'sum' for c in cand_cols_16}
-    df_16_agg = df_2016.groupby('booth_no').agg(agg_16).reset_index()
+    # Both aggregates keep booth_no as their index so they can be joined index-to-index
+    df_16_agg = df_2016.groupby('booth_no', sort=False)[cand_cols_16].sum()
     
-    df_16_clean = pd.DataFrame()
-    df_16_clean['booth_no'] = df_16_agg['booth_no']
-    df_16_clean['total_votes_2016'] = df_16_agg[cand_cols_16].apply(pd.to_numeric, errors='coerce').fillna(0).sum(axis=1)
+    df_16_clean = pd.DataFrame(index=df_16_agg.index)
+    df_16_clean['total_votes_2016'] = df_16_agg[cand_cols_16].sum(axis=1)
     
     for party, col in mapping['2016'].items():
-        df_16_clean[f'{party}_2016'] = pd.to_numeric(df_16_agg[col], errors='coerce').fillna(0)
+        df_16_clean[f'{party}_2016'] = df_16_agg[col]
     
     # Clean 2021 Data
-    df_2021['booth_no'] = df_2021['polling_station_no'].apply(get_booth_num)
+    df_2021['booth_no'] = get_booth_nums(df_2021['polling_station_no'])
     
     # Identify Candidate Columns for 2021
     cand_cols_21 = [c for c in df_2021.columns if c.startswith('candidate_') and not any(x in c for x in ['valid', 'rejected', 'total', 'tendered'])]
@@ -51,16 +85,13 @@ def analyze_constituency(ac_id, mapping, dir_2016, dir_2021):
     # Most 2021 files have ~20 candidates, then totals.
     # Let's just use the ones mapped or sum all candidate_* that are numeric
     
-    df_2021_nums = df_2021.copy()
-    for col in cand_cols_21:
-        df_2021_nums[col] = pd.to_numeric(df_2021[col], errors='coerce').fillna(0)
+    # Vote columns are already numeric (see read_vote_csv), so df_2021 is used as-is below
     
     # Calculated Total for 2021
     # We'll only sum the ones that seem like actual candidate columns (usually up to Candidate 20 or so)
     # Actually, let's just trust the sum of candidate columns we mapped + NOTA if we can find it.
     
     map_21 = mapping['2021']
-    df_21_agg_base = df_2021_nums.groupby('booth_no')
     
     # Aggregate only necessary columns
     agg_cols = list(map_21.values())
@@ -69,14 +100,15 @@ def analyze_constituency(ac_id, mapping, dir_2016, dir_2021):
     # In 2021, columns[-4:] are totals.
     actual_cand_cols_21 = cand_cols_21[:-4] if len(cand_cols_21) > 4 else cand_cols_21
     
-    df_21_agg = df_21_agg_base[actual_cand_cols_21].sum().reset_index()
+    # sort=False: the join below keeps the 2016 booth order, so sorting keys here is wasted work
+    df_21_agg = df_2021.groupby('booth_no', sort=False)[actual_cand_cols_21].sum()
     df_21_agg['total_votes_2021'] = df_21_agg[actual_cand_cols_21].sum(axis=1)
     
     for party, col in map_21.items():
         df_21_agg.rename(columns={col: f'{party}_2021'}, inplace=True)
     
     # Merge
-    merged = pd.merge(df_16_clean, df_21_agg, on='booth_no', how='inner')
+    merged = df_16_clean.join(df_21_agg, how='inner', sort=False).reset_index()
     
     # Filter out rows with 0 total votes to avoid Infinity
     merged = merged[(merged['total_votes_2016'] > 0) & (merged['total_votes_2021'] > 0)]
@@ -90,12 +122,24 @@ def analyze_constituency(ac_id, mapping, dir_2016, dir_2021):
         merged['DMK_INC_2021'] = merged.get('DMK_2021', 0)
         common_parties.add('DMK_INC')
 
-    for party in common_parties:
-        merged[f'{party}_share_2016'] = (merged[f'{party}_2016'] / merged['total_votes_2016'] * 100).round(2)
-        merged[f'{party}_share_2021'] = (merged[f'{party}_2021'] / merged['total_votes_2021'] * 100).round(2)
-        merged[f'{party}_swing'] = (merged[f'{party}_share_2021'] - merged[f'{party}_share_2016']).round(2)
+    # Shares and swings for every party in one matrix pass: (booths x parties) arrays
+    parties = list(common_parties)
+    votes_16 = merged[[f'{p}_2016' for p in parties]].to_numpy(dtype=float)
+    votes_21 = merged[[f'{p}_2021' for p in parties]].to_numpy(dtype=float)
+    total_16 = merged['total_votes_2016'].to_numpy(dtype=float)[:, None]
+    total_21 = merged['total_votes_2021'].to_numpy(dtype=float)[:, None]
+    
+    # Left unrounded; main() rounds every float column once at export
+    share_16 = votes_16 / total_16 * 100
+    share_21 = votes_21 / total_21 * 100
+    swing = share_21 - share_16
     
-    merged['turnout_change'] = ((merged['total_votes_2021'] - merged['total_votes_2016']) / merged['total_votes_2016'] * 100).round(2)
+    # Interleave to share_2016, share_2021, swing per party and add all columns at once
+    share_cols = [col for p in parties for col in (f'{p}_share_2016', f'{p}_share_2021', f'{p}_swing')]
+    shares = np.stack([share_16, share_21, swing], axis=2).reshape(len(merged), 3 * len(parties))
+    merged = pd.concat([merged, pd.DataFrame(shares, columns=share_cols, index=merged.index)], axis=1)
+    
+    merged['turnout_change'] = (merged['total_votes_2021'] - merged['total_votes_2016']) / merged['total_votes_2016'] * 100
     
     return merged
     
@@ -107,14 +151,21 @@ def main():
     out_dir = base_dir / "tn_elections_2016/output"
     out_dir.mkdir(exist_ok=True)
     
-    with open(base_dir / "tn_elections_2016/scripts/candidate_mapping.json", 'r') as f:
-        mapping = json.load(f)
+    mapping = load_json(base_dir / "tn_elections_2016/scripts/candidate_mapping.json")
     
     all_summary = []
     
-    for ac_id, m in mapping.items():
-        results = analyze_constituency(ac_id, m, dir_16, dir_21)
+    # Constituencies are independent; analyze them in parallel and write outputs from here
+    ac_ids = list(mapping.keys())
+    with ProcessPoolExecutor() as ex:
+        all_results = list(ex.map(analyze_constituency, ac_ids, mapping.values(), repeat(dir_16), repeat(dir_21)))
+    
+    for ac_id, results in zip(ac_ids, all_results):
+        m = mapping[ac_id]
         if results is not None:
+            # Round all shares, swings and turnout change in one pass
+            float_cols = results.select_dtypes(include='float').columns
+            results[float_cols] = results[float_cols].round(2)
             results.to_csv(out_dir / f"{ac_id}_comparison.csv", index=False)
             print(f"  ✓ Saved to {ac_id}_comparison.csv")
             
@@ -128,8 +179,7 @@ def main():
             }
             all_summary.append(summary)
     
-    with open(out_dir / "election_comparison_summary.json", 'w') as f:
-        json.dump(all_summary, f, indent=2)
+    dump_json(all_summary, out_dir / "election_comparison_summary.json")
     print("\nOverall Analysis Complete!")
 
 if __name__ == "__main__":
@@ -3,14 +3,29 @@ import pdfplumber
 import csv
 import re
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def extract_constituency_info(pdf):
-    first_page = pdf.pages[0]
-    text = first_page.extract_text()
-    
+# PyMuPDF is optional; it reads raw page text without pdfminer's layout analysis
+try:
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+# Compiled once; the header check runs for every table row
+_CONST_RE = re.compile(r'(\d{3})-([A-Za-z\s\(\)]+)')
+_HDR_RE = re.compile(r'^1 2 3 4')
+
+def first_page_text(pdf_path, pdf):
+    if PYMUPDF_AVAILABLE:
+        with pymupdf.open(pdf_path) as doc:
+            return doc[0].get_text()
+    return pdf.pages[0].extract_text()
+
+def extract_constituency_info(text):
     # Extract constituency name (pattern: "036-UTHIRAMERUR" or similar)
-    const_match = re.search(r'(\d{3})-([A-Za-z\s\(\)]+)', text)
+    const_match = _CONST_RE.search(text)
     if const_match:
         ac_number = const_match.group(1)
         # Just take the first word or line as the name to avoid capturing candidate list
@@ -21,52 +36,56 @@ def extract_constituency_info(pdf):
     
     return ac_number, ac_name
 
+def build_header(num_cols):
+    # Col 0: Table No, Col 1: PS No, Col 2..N-4: Candidates, N-3: Valid, N-2: Rejected, N-1: Total, N: Tendered
+    header = ['ac_number', 'ac_name', 'table_no', 'polling_station_no']
+    for i in range(1, num_cols - 5):
+        header.append(f'candidate_{i}')
+    header += ['total_valid', 'rejected', 'total', 'tendered']
+    
+    # If column count doesn't match this schema exactly, just use generic headers
+    if len(header) != num_cols + 2:
+        header = ['ac_number', 'ac_name'] + [f'col_{i}' for i in range(num_cols)]
+    return header
+
 def extract_2016_pdf(pdf_path, output_csv):
     print(f"Processing 2016 PDF: {pdf_path}")
     with pdfplumber.open(pdf_path) as pdf:
-        ac_num, ac_name = extract_constituency_info(pdf)
+        ac_num, ac_name = extract_constituency_info(first_page_text(pdf_path, pdf))
         print(f"  Constituency: {ac_num} - {ac_name}")
         
-        all_rows = []
-        
-        for page_num, page in enumerate(pdf.pages, 1):
-            table = page.extract_table()
-            if not table:
-                continue
+        # Rows are written as each page is parsed, so memory doesn't grow with the PDF
+        num_rows = 0
+        with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
             
-            for row in table:
-                if not row or not row[0]:
+            for page_num, page in enumerate(pdf.pages, 1):
+                # Tables stay on pdfplumber: PyMuPDF's find_tables() splits the
+                # header rows differently, which would shift the CSV schema
+                table = page.extract_table()
+                # Release pdfplumber's cached layout objects for this page
+                page.flush_cache()
+                if not table:
                     continue
                 
-                # Check if it's a booth row (starts with digit and first column is not '1 2 3...')
-                row_str = " ".join([str(c) for c in row if c])
-                if str(row[0]).strip().isdigit() and not re.match(r'^1 2 3 4', row_str):
-                    # Clean row
-                    cleaned_row = [str(cell).strip().replace('\n', ' ') if cell else '0' for cell in row]
-                    all_rows.append(cleaned_row)
-        
-        print(f"  Extracted {len(all_rows)} booths")
+                for row in table:
+                    if not row or not row[0]:
+                        continue
+                    
+                    # Check if it's a booth row (starts with digit and first column is not '1 2 3...')
+                    row_str = " ".join([str(c) for c in row if c])
+                    if str(row[0]).strip().isdigit() and not _HDR_RE.match(row_str):
+                        # Clean row
+                        cleaned_row = [str(cell).strip().replace('\n', ' ') if cell else '0' for cell in row]
+                        # Header layout is fixed by the first booth row's width
+                        if num_rows == 0:
+                            writer.writerow(build_header(len(cleaned_row)))
+                        writer.writerow([ac_num, ac_name] + cleaned_row)
+                        num_rows += 1
         
-        # Write to CSV
-        with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            if all_rows:
-                num_cols = len(all_rows[0])
-                # Col 0: Table No, Col 1: PS No, Col 2..N-4: Candidates, N-3: Valid, N-2: Rejected, N-1: Total, N: Tendered
-                header = ['ac_number', 'ac_name', 'table_no', 'polling_station_no']
-                for i in range(1, num_cols - 5):
-                    header.append(f'candidate_{i}')
-                header += ['total_valid', 'rejected', 'total', 'tendered']
-                
-                # If column count doesn't match this schema exactly, just use generic headers
-                if len(header) != num_cols + 2:
-                    header = ['ac_number', 'ac_name'] + [f'col_{i}' for i in range(num_cols)]
-                
-                writer.writerow(header)
-                for row in all_rows:
-                    writer.writerow([ac_num, ac_name] + row)
+        print(f"  Extracted {num_rows} booths")
     
-    return len(all_rows)
+    return num_rows
 
 def main():
     base_dir = Path("/Users/karthikselvan/Desktop/eeze/tn_elections_2016")
@@ -81,11 +100,18 @@ def main():
         "Ac028.pdf"
     ]
     
+    pdf_paths = []
+    csv_paths = []
     for f in files:
         pdf_path = raw_dir / f
         if pdf_path.exists():
-            csv_path = out_dir / f.replace(".pdf", ".csv")
-            extract_2016_pdf(pdf_path, csv_path)
+            pdf_paths.append(pdf_path)
+            csv_paths.append(out_dir / f.replace(".pdf", ".csv"))
+    
+    # Each PDF is independent and parsing is CPU-bound, so run them in parallel.
+    # Workers open their own pdfplumber handle; only paths cross the process boundary.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        list(ex.map(extract_2016_pdf, pdf_paths, csv_paths))
 
 if __name__ == "__main__":
     main()
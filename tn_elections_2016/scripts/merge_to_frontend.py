@@ -1,8 +1,39 @@
 import pandas as pd
 import json
 import os
+from functools import lru_cache
 from pathlib import Path
 
+
+# orjson is optional and much faster; the json fallback writes the same indented JSON,
+# except that orjson writes NaN/Infinity as null
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def load_json(path):
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def dump_json(obj, path):
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+
+@lru_cache(maxsize=None)
+def load_comparison(csv_path, mtime_ns):
+    # Returns the comparison frame plus a booth_no -> row lookup; treat both as read-only
+    df_comp = pd.read_csv(csv_path)
+    return df_comp, df_comp.set_index('booth_no').to_dict('index')
+
 def merge_comparison_to_json(ac_id, name, output_dir, json_dir):
     csv_path = output_dir / f"{ac_id}_comparison.csv"
     json_path = json_dir / f"{name.lower()}.json"
@@ -11,15 +42,11 @@ def merge_comparison_to_json(ac_id, name, output_dir, json_dir):
         print(f"Skipping {ac_id}: CSV or JSON not found")
         return
 
-    # Load Comparison CSV
-    df_comp = pd.read_csv(csv_path)
+    # Load Comparison CSV and its booth lookup (cached; mtime in the key so edits are re-read)
+    df_comp, comp_map = load_comparison(str(csv_path), csv_path.stat().st_mtime_ns)
     
     # Load Existing JSON
-    with open(json_path, 'r') as f:
-        data = json.load(f)
-        
-    # Create a lookup for comparison data
-    comp_map = df_comp.set_index('booth_no').to_dict('index')
+    data = load_json(json_path)
     
     # Identify swing columns
     dmk_swing_col = next((c for c in df_comp.columns if 'swing' in c and 'DMK' in c and 'AIADMK' not in c), None)
@@ -47,8 +74,7 @@ def merge_comparison_to_json(ac_id, name, output_dir, json_dir):
     data['summary']['avg_turnout_change'] = float(df_comp['turnout_change'].mean())
 
     # Save updated JSON
-    with open(json_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    dump_json(data, json_path)
     print(f"Updated {json_path}")
 
 def main():
@@ -5,41 +5,81 @@ Analyze extracted booth-level data and create summary reports.
 
 import csv
 import json
+import shutil
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from collections import defaultdict
 
+# orjson is optional and much faster; the json fallback writes the same indented JSON,
+# except that orjson writes NaN/Infinity as null
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-def analyze_constituency(csv_path):
-    """Analyze a single constituency CSV file."""
-    
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+# pyarrow is optional; its multithreaded C++ CSV reader replaces pandas' parser when installed
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+def dump_json(obj, path):
+    """Write obj as indented JSON, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+
+
+# Non-vote columns in the extracted booth CSVs
+METADATA_COLS = frozenset({'constituency_number', 'constituency_name', 'table_no', 'polling_station_no', 'note'})
+
+
+def load_booths(csv_path):
+    """Load a constituency CSV once, as text, for both the analysis and the combined CSV."""
+    # Text keeps cells exactly as extracted ("028", blanks) when they are written back out
+    if PYARROW_AVAILABLE:
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f), [])
+        convert_options = pa_csv.ConvertOptions(
+            column_types={col: pa.string() for col in header},
+            quoted_strings_can_be_null=False
+        )
+        return pa_csv.read_csv(csv_path, convert_options=convert_options).to_pandas()
+    return pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+
+
+def is_placeholder(df):
+    """Placeholder files (image-based PDFs) carry an OCR message in a 'note' column."""
+    return not df.empty and 'note' in df.columns and bool(df['note'].iloc[0])
+
+
+def analyze_constituency(df):
+    """Analyze a single constituency's booth rows."""
     
-    if not rows:
+    if df.empty:
         return None
     
     # Get constituency info
-    const_num = rows[0]['constituency_number']
-    const_name = rows[0]['constituency_name']
+    const_num = df['constituency_number'].iloc[0]
+    const_name = df['constituency_name'].iloc[0]
     
     # Count booths
-    num_booths = len(rows)
+    num_booths = len(df)
     
     # Calculate total votes per candidate
     # Identify vote columns (skip metadata columns)
-    metadata_cols = {'constituency_number', 'constituency_name', 'table_no', 'polling_station_no', 'note'}
-    vote_columns = [col for col in rows[0].keys() if col not in metadata_cols]
-    
-    candidate_totals = defaultdict(int)
+    vote_columns = [col for col in df.columns if col not in METADATA_COLS]
     
-    for row in rows:
-        for col in vote_columns:
-            try:
-                votes = int(row[col]) if row[col] else 0
-                candidate_totals[col] += votes
-            except ValueError:
-                pass
+    # Column sums in C instead of a Python int() per cell; blank or non-numeric cells count as 0
+    votes = df[vote_columns].apply(pd.to_numeric, errors='coerce').fillna(0)
+    candidate_totals = {col: int(total) for col, total in votes.sum().items()}
     
     # Sort by votes
     sorted_candidates = sorted(candidate_totals.items(), key=lambda x: x[1], reverse=True)
@@ -53,6 +93,27 @@ def analyze_constituency(csv_path):
     }
 
 
+def load_and_analyze(csv_path):
+    """Worker for the process pool: returns the loaded rows along with their analysis."""
+    df = load_booths(csv_path)
+    return df, analyze_constituency(df)
+
+
+def concat_csvs(paths, out_path):
+    """Concatenate CSVs that share a header without parsing them."""
+    with open(out_path, 'wb') as dst:
+        for i, path in enumerate(paths):
+            with open(path, 'rb') as src:
+                if i > 0:
+                    src.readline()  # header already written
+                shutil.copyfileobj(src, dst, 1 << 20)
+                # Keep the next file's first row off the last line of this one
+                if src.tell() > 0:
+                    src.seek(-1, 2)
+                    if src.read(1) != b'\n':
+                        dst.write(b'\n')
+
+
 def main():
     base_dir = Path(__file__).parent.parent
     extracted_dir = base_dir / "extracted"
@@ -67,9 +128,12 @@ def main():
     all_results = []
     total_booths = 0
     
-    for csv_file in csv_files:
-        result = analyze_constituency(csv_file)
-        
+    # Each CSV is parsed once, in parallel; the frames are reused for the combined CSV below
+    with ProcessPoolExecutor() as ex:
+        loaded = list(ex.map(load_and_analyze, csv_files))
+    frames = [df for df, _ in loaded]
+    
+    for _, result in loaded:
         if result and result['num_booths'] > 0:
             all_results.append(result)
             total_booths += result['num_booths']
@@ -90,40 +154,32 @@ def main():
     
     # Save summary to JSON
     summary_file = output_dir / "kanchipuram_summary.json"
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            'constituencies': all_results,
-            'total_booths': total_booths,
-            'total_votes': sum(r['total_votes'] for r in all_results)
-        }, f, indent=2)
+    dump_json({
+        'constituencies': all_results,
+        'total_booths': total_booths,
+        'total_votes': sum(r['total_votes'] for r in all_results)
+    }, summary_file)
     
     print(f"\n✓ Summary saved to: {summary_file}")
     
     # Create combined CSV
     combined_csv = output_dir / "kanchipuram_all_booths.csv"
     
-    with open(combined_csv, 'w', newline='', encoding='utf-8') as outfile:
-        writer = None
+    # Skip placeholders (OCR message, no booth rows)
+    sources = [(path, df) for path, df in zip(csv_files, frames) if not is_placeholder(df)]
+    
+    if sources and all(list(df.columns) == list(sources[0][1].columns) for _, df in sources):
+        # Same header everywhere: concatenate the raw bytes, keeping only the first header
+        concat_csvs([path for path, _ in sources], combined_csv)
+    else:
+        # Files can have different candidate columns, so the header is the union in first-seen order
+        fieldnames = list(dict.fromkeys(col for _, df in sources for col in df.columns))
         
-        for csv_file in csv_files:
-            with open(csv_file, 'r', encoding='utf-8') as infile:
-                reader = csv.DictReader(infile)
-                
-                # Skip if it's a placeholder (has 'note' column with OCR message)
-                first_row = next(reader, None)
-                if first_row and first_row.get('note'):
-                    continue
-                
-                if writer is None:
-                    # Initialize writer with first file's headers
-                    writer = csv.DictWriter(outfile, fieldnames=reader.fieldnames)
-                    writer.writeheader()
-                
-                if first_row:
-                    writer.writerow(first_row)
-                
-                for row in reader:
-                    writer.writerow(row)
+        with open(combined_csv, 'w', newline='', encoding='utf-8') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for _, df in sources:
+                writer.writerows(df.to_dict('records'))
     
     print(f"✓ Combined data saved to: {combined_csv}")
     print("=" * 80)
@@ -13,16 +13,28 @@ academic research often uses 5-10% for swing/competitive classification.
 
 import csv
 import json
+import numpy as np
+import pandas as pd
 from pathlib import Path
 from collections import defaultdict
 from tabulate import tabulate
 
+# Numba is optional; without it the NumPy version of the classification kernel is used
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 
 # Classification thresholds (as percentage of total votes in booth)
 SWING_THRESHOLD = 5.0      # < 5% margin = Swing
 LEAN_THRESHOLD = 10.0      # 5-10% margin = Lean
 # > 10% margin = Strong
 
+# Category codes returned by rank_and_classify index into this array
+CATEGORIES = np.array(['SWING', 'LEAN', 'STRONG'])
+
 # Column mappings for parties (decoded from reversed text)
 PARTY_COLUMNS = {
     '028': {  # Alandur
@@ -45,82 +57,123 @@ PARTY_COLUMNS = {
 }
 
 
-def classify_booth(margin_pct):
-    """Classify booth based on margin percentage."""
-    if margin_pct < SWING_THRESHOLD:
-        return "SWING"
-    elif margin_pct < LEAN_THRESHOLD:
-        return "LEAN"
-    else:
-        return "STRONG"
+def _rank_and_classify_numpy(votes, swing_threshold, lean_threshold):
+    # Rank parties per booth; a stable sort keeps PARTY_COLUMNS order on ties
+    order = np.argsort(-votes, axis=1, kind='stable')
+    winner_idx = order[:, 0]
+    runner_idx = order[:, 1]
+    
+    rows = np.arange(len(votes))
+    winner_votes = votes[rows, winner_idx]
+    runner_votes = votes[rows, runner_idx]
+    
+    # Margin as a percentage of the top-two vote total
+    margin = winner_votes - runner_votes
+    total_two_party = winner_votes + runner_votes
+    margin_pct = np.divide(margin, total_two_party, out=np.zeros(len(margin)), where=total_two_party > 0) * 100
+    
+    category_code = np.select([margin_pct < swing_threshold, margin_pct < lean_threshold], [0, 1], default=2)
+    return winner_idx, runner_idx, margin_pct, category_code
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True)
+    def _rank_and_classify_numba(votes, swing_threshold, lean_threshold):
+        n, p = votes.shape
+        winner_idx = np.empty(n, np.int64)
+        runner_idx = np.empty(n, np.int64)
+        margin_pct = np.zeros(n, np.float64)
+        category_code = np.empty(n, np.int64)
+        
+        for i in prange(n):
+            # First maximum wins ties, matching the stable sort in the NumPy version
+            w = 0
+            for j in range(1, p):
+                if votes[i, j] > votes[i, w]:
+                    w = j
+            r = -1
+            for j in range(p):
+                if j != w and (r < 0 or votes[i, j] > votes[i, r]):
+                    r = j
+            winner_idx[i] = w
+            runner_idx[i] = r
+            
+            total_two_party = votes[i, w] + votes[i, r]
+            if total_two_party > 0:
+                margin_pct[i] = (votes[i, w] - votes[i, r]) / total_two_party * 100
+            
+            if margin_pct[i] < swing_threshold:
+                category_code[i] = 0
+            elif margin_pct[i] < lean_threshold:
+                category_code[i] = 1
+            else:
+                category_code[i] = 2
+        
+        return winner_idx, runner_idx, margin_pct, category_code
+
+
+def rank_and_classify(votes):
+    """Winner/runner-up column, margin % and category code for each row of a (booths x parties) vote matrix."""
+    if NUMBA_AVAILABLE:
+        return _rank_and_classify_numba(votes, SWING_THRESHOLD, LEAN_THRESHOLD)
+    return _rank_and_classify_numpy(votes, SWING_THRESHOLD, LEAN_THRESHOLD)
 
 
 def analyze_booths(csv_path, constituency_num):
     """Analyze booth-level data and classify each booth."""
     
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    # Booth numbers stay text ("5 (M)"); vote columns are coerced below
+    df = pd.read_csv(csv_path, dtype={'polling_station_no': str})
     
-    if not rows:
+    if df.empty:
         return None
     
     # Get party columns for this constituency
     party_cols = PARTY_COLUMNS.get(constituency_num, {})
     
-    results = []
     category_counts = defaultdict(lambda: defaultdict(int))
     
-    for row in rows:
-        booth_no = row.get('polling_station_no', 'Unknown')
-        
-        # Get votes for main parties
-        party_votes = {}
-        for party, col in party_cols.items():
-            try:
-                party_votes[party] = int(row.get(col, 0) or 0)
-            except (ValueError, TypeError):
-                party_votes[party] = 0
-        
-        if not party_votes:
-            continue
-            
-        # Calculate total votes (for main 2 parties for margin)
-        sorted_parties = sorted(party_votes.items(), key=lambda x: x[1], reverse=True)
-        
-        if len(sorted_parties) < 2:
-            continue
-            
-        winner_party, winner_votes = sorted_parties[0]
-        runner_party, runner_votes = sorted_parties[1]
-        
-        # Calculate margin percentage
-        total_two_party = winner_votes + runner_votes
-        if total_two_party > 0:
-            margin = winner_votes - runner_votes
-            margin_pct = (margin / total_two_party) * 100
-        else:
-            margin_pct = 0
-        
-        # Classify
-        category = classify_booth(margin_pct)
-        full_category = f"{category} {winner_party}"
-        
-        category_counts[category][winner_party] += 1
-        
-        results.append({
-            'booth': booth_no,
-            'winner': winner_party,
-            'winner_votes': winner_votes,
-            'runner_up': runner_party,
-            'runner_votes': runner_votes,
-            'margin': margin,
-            'margin_pct': margin_pct,
-            'category': category,
-            'full_category': full_category,
-        })
+    # Need at least two parties to compute a margin
+    if len(party_cols) < 2:
+        return [], category_counts
+    
+    parties = np.array(list(party_cols.keys()))
+    
+    # (n_booths, n_parties) vote matrix; missing columns or bad cells count as 0
+    votes = (df.reindex(columns=list(party_cols.values()))
+               .apply(pd.to_numeric, errors='coerce')
+               .fillna(0)
+               .to_numpy(dtype=np.int64))
+    
+    # Rank and classify every booth
+    winner_idx, runner_idx, margin_pct, category_code = rank_and_classify(votes)
+    
+    rows = np.arange(len(votes))
+    winner_votes = votes[rows, winner_idx]
+    runner_votes = votes[rows, runner_idx]
+    margin = winner_votes - runner_votes
+    
+    if 'polling_station_no' in df.columns:
+        booth_no = df['polling_station_no'].fillna('')
+    else:
+        booth_no = 'Unknown'
+    
+    results_df = pd.DataFrame({
+        'booth': booth_no,
+        'winner': parties[winner_idx],
+        'winner_votes': winner_votes,
+        'runner_up': parties[runner_idx],
+        'runner_votes': runner_votes,
+        'margin': margin,
+        'margin_pct': margin_pct,
+        'category': CATEGORIES[category_code],
+    })
+    results_df['full_category'] = results_df['category'] + ' ' + results_df['winner']
+    
+    for (cat, party), count in results_df.groupby(['category', 'winner']).size().items():
+        category_counts[cat][party] = int(count)
     
-    return results, category_counts
+    return results_df.to_dict('records'), category_counts
 
 
 def print_classification_summary(results, category_counts, constituency_name):
@@ -205,22 +258,16 @@ def print_classification_summary(results, category_counts, constituency_name):
 def save_booth_classification(results, output_path):
     """Save detailed booth classification to CSV."""
     with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=[
+        writer = csv.writer(f)
+        writer.writerow([
             'booth', 'category', 'winner', 'winner_votes', 
             'runner_up', 'runner_votes', 'margin', 'margin_pct'
         ])
-        writer.writeheader()
-        for r in results:
-            writer.writerow({
-                'booth': r['booth'],
-                'category': r['full_category'],
-                'winner': r['winner'],
-                'winner_votes': r['winner_votes'],
-                'runner_up': r['runner_up'],
-                'runner_votes': r['runner_votes'],
-                'margin': r['margin'],
-                'margin_pct': round(r['margin_pct'], 2)
-            })
+        writer.writerows(
+            (r['booth'], r['full_category'], r['winner'], r['winner_votes'],
+             r['runner_up'], r['runner_votes'], r['margin'], round(r['margin_pct'], 2))
+            for r in results
+        )
     print(f"✅ Booth classification saved to: {output_path}")
 
 
@@ -4,12 +4,26 @@ Booth Classification Visualization
 Creates visual charts showing booth-level voting patterns.
 """
 
-import csv
+import matplotlib
+matplotlib.use("Agg")  # files only; no GUI backend to initialise
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from matplotlib.colors import ListedColormap
 import numpy as np
+import pandas as pd
 from pathlib import Path
-from collections import defaultdict
+
+# fast-histogram is optional; np.histogram is used when it isn't installed
+try:
+    from fast_histogram import histogram1d
+    FAST_HISTOGRAM_AVAILABLE = True
+except ImportError:
+    FAST_HISTOGRAM_AVAILABLE = False
+
+# Cheaper path rendering; none of these charts have paths dense enough for it to show
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+plt.rcParams['agg.path.chunksize'] = 10000
 
 # Color schemes
 COLORS = {
@@ -35,29 +49,60 @@ CATEGORY_COLORS = {
     'LEAN AMMK': '#9C7BC0',
 }
 
+# Booth grid palette: one colour per category, then grey for unknown categories and white
+GRID_CATEGORY_IDS = {category: i for i, category in enumerate(CATEGORY_COLORS)}
+GRID_OTHER = len(CATEGORY_COLORS)
+GRID_WHITE = GRID_OTHER + 1
+GRID_CMAP = ListedColormap(list(CATEGORY_COLORS.values()) + ['#999999', '#FFFFFF'])
+
 
 def load_classification_data(csv_path):
-    """Load booth classification data from CSV."""
-    data = []
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            data.append(row)
+    """Load booth classification data from CSV into a DataFrame."""
+    # Text everywhere keeps booth labels like "5 (M)" and vote margins as written
+    data = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    data['margin_pct'] = data['margin_pct'].astype(float)
     return data
 
 
-def create_pie_chart(data, output_path):
+def new_chart(fig, width, height):
+    """Clear the shared figure and resize it for the next chart."""
+    fig.clear()
+    fig.set_size_inches(width, height)
+
+
+def save_chart(fig, output_path, tight_bbox=False):
+    """Lay out and save the shared figure."""
+    fig.tight_layout()
+    # tight_layout already fits everything inside the figure; the costly tight-bbox pass is
+    # only needed when an artist (e.g. a legend) sits outside the axes
+    fig.savefig(output_path, dpi=150, bbox_inches='tight' if tight_bbox else None, facecolor='white')
+    print(f"✅ Saved: {output_path}")
+
+
+def uniform_histogram(values, bins, value_range):
+    """Counts and edges for equal-width bins, like np.histogram(values, bins, value_range)."""
+    lo, hi = value_range
+    edges = np.linspace(lo, hi, bins + 1)
+    if FAST_HISTOGRAM_AVAILABLE:
+        counts = histogram1d(values, bins=bins, range=value_range).astype(np.int64)
+        # histogram1d's last bin is half-open; np.histogram's includes the upper edge
+        counts[-1] += np.count_nonzero(values == hi)
+        return counts, edges
+    return np.histogram(values, bins=bins, range=value_range)
+
+
+def create_pie_chart(data, output_path, fig):
     """Create pie chart of booth categories."""
-    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+    new_chart(fig, 14, 6)
+    axes = fig.subplots(1, 2)
     
     # Left: Category breakdown
-    category_counts = defaultdict(int)
-    for row in data:
-        cat = row['category'].split()[0]  # SWING, LEAN, or STRONG
-        category_counts[cat] += 1
+    category_parts = data['category'].str.split()
+    cats = category_parts.str[0]  # SWING, LEAN, or STRONG
+    category_counts = cats.groupby(cats, sort=False).size()
     
-    labels = list(category_counts.keys())
-    sizes = list(category_counts.values())
+    labels = list(category_counts.index)
+    sizes = list(category_counts.values)
     colors = ['#FFD700', '#87CEEB', '#228B22']
     explode = (0.05, 0, 0)
     
@@ -66,12 +111,8 @@ def create_pie_chart(data, output_path):
     axes[0].set_title('Booth Classification Distribution', fontsize=14, fontweight='bold')
     
     # Right: Party breakdown within categories
-    party_cat_counts = defaultdict(lambda: defaultdict(int))
-    for row in data:
-        parts = row['category'].split()
-        cat = parts[0]
-        party = parts[1] if len(parts) > 1 else 'Unknown'
-        party_cat_counts[cat][party] += 1
+    parties_won = category_parts.str[1].fillna('Unknown')
+    party_cat_counts = data.groupby([cats, parties_won]).size()
     
     # Stacked bar data
     categories = ['SWING', 'LEAN', 'STRONG']
@@ -81,7 +122,7 @@ def create_pie_chart(data, output_path):
     width = 0.25
     
     for i, party in enumerate(parties):
-        counts = [party_cat_counts[cat].get(party, 0) for cat in categories]
+        counts = [int(party_cat_counts.get((cat, party), 0)) for cat in categories]
         if sum(counts) > 0:
             bars = axes[1].bar(x + i*width, counts, width, label=party, 
                               color=COLORS.get(party, '#999999'))
@@ -99,77 +140,81 @@ def create_pie_chart(data, output_path):
     axes[1].legend()
     axes[1].grid(axis='y', alpha=0.3)
     
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close()
-    print(f"✅ Saved: {output_path}")
+    save_chart(fig, output_path)
 
 
-def create_margin_histogram(data, output_path):
+def create_margin_histogram(data, output_path, fig):
     """Create histogram of vote margins."""
-    fig, ax = plt.subplots(figsize=(12, 6))
+    new_chart(fig, 12, 6)
+    ax = fig.subplots()
     
-    dmk_margins = []
-    aiadmk_margins = []
+    margins = data['margin_pct'].to_numpy()
+    winners = data['winner'].to_numpy()
     
-    for row in data:
-        margin = float(row['margin_pct'])
-        if row['winner'] == 'DMK':
-            dmk_margins.append(margin)
-        elif row['winner'] == 'AIADMK':
-            aiadmk_margins.append(-margin)  # Negative for AIADMK wins
+    dmk_margins = margins[winners == 'DMK']
+    aiadmk_margins = -margins[winners == 'AIADMK']  # Negative for AIADMK wins
     
-    # Create histogram
-    bins = np.linspace(-50, 50, 51)
+    # Uniform 2%-wide bins on a fixed range, counted directly and drawn as plain bars
+    dmk_counts, dmk_edges = uniform_histogram(dmk_margins, 25, (0, 50))
+    aiadmk_counts, aiadmk_edges = uniform_histogram(aiadmk_margins, 25, (-50, 0))
     
-    ax.hist(dmk_margins, bins=[b for b in bins if b >= 0], 
-            color=COLORS['DMK'], alpha=0.7, label='DMK Won', edgecolor='black')
-    ax.hist(aiadmk_margins, bins=[b for b in bins if b <= 0], 
-            color=COLORS['AIADMK'], alpha=0.7, label='AIADMK Won', edgecolor='black')
+    dmk_bars = ax.bar(dmk_edges[:-1], dmk_counts, width=np.diff(dmk_edges), align='edge',
+           color=COLORS['DMK'], alpha=0.7, label='DMK Won', edgecolor='black')
+    aiadmk_bars = ax.bar(aiadmk_edges[:-1], aiadmk_counts, width=np.diff(aiadmk_edges), align='edge',
+           color=COLORS['AIADMK'], alpha=0.7, label='AIADMK Won', edgecolor='black')
     
     # Add swing zone
-    ax.axvspan(-5, 5, alpha=0.2, color='yellow', label='Swing Zone (<5%)')
+    swing_zone = ax.axvspan(-5, 5, alpha=0.2, color='yellow', label='Swing Zone (<5%)')
     ax.axvline(x=0, color='black', linestyle='--', linewidth=2)
     
     ax.set_xlabel('Vote Margin % (Negative = AIADMK, Positive = DMK)', fontsize=12)
     ax.set_ylabel('Number of Booths', fontsize=12)
     ax.set_title('Distribution of Vote Margins Across Booths - Uthiramerur', 
                 fontsize=14, fontweight='bold')
-    ax.legend(loc='upper right')
+    # Explicit handles: bar containers would otherwise be listed after the swing zone
+    ax.legend(handles=[dmk_bars, aiadmk_bars, swing_zone], loc='upper right')
     ax.grid(axis='y', alpha=0.3)
     
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close()
-    print(f"✅ Saved: {output_path}")
+    save_chart(fig, output_path)
 
 
-def create_booth_grid(data, output_path):
+def create_booth_grid(data, output_path, fig):
     """Create a grid visualization of all booths."""
-    fig, ax = plt.subplots(figsize=(16, 10))
+    new_chart(fig, 16, 10)
+    ax = fig.subplots()
     
     # Sort booths by margin
-    sorted_data = sorted(data, key=lambda x: float(x['margin_pct']))
+    sorted_data = data.sort_values('margin_pct', kind='stable')
     
     # Create grid (20 columns)
     cols = 20
     rows = (len(sorted_data) + cols - 1) // cols
     
-    for idx, row in enumerate(sorted_data):
-        x = idx % cols
-        y = rows - 1 - (idx // cols)
-        
-        # Determine color based on category
-        category = row['category']
-        color = CATEGORY_COLORS.get(category, '#999999')
-        
-        rect = plt.Rectangle((x, y), 0.9, 0.9, facecolor=color, edgecolor='white', linewidth=0.5)
-        ax.add_patch(rect)
-        
-        # Add booth number for swing booths
-        if 'SWING' in category:
-            ax.text(x + 0.45, y + 0.45, row['booth'][:3], ha='center', va='center', 
-                   fontsize=5, color='white', fontweight='bold')
+    # One indexed image instead of a Rectangle artist per booth; the colormap colours it at draw
+    # time. Each booth is a CELL_PX-square block whose last column and top row stay white
+    # (GRID_WHITE), giving the same 0.9-wide tiles with gaps
+    CELL_PX = 10
+    category_ids = sorted_data['category'].map(GRID_CATEGORY_IDS).fillna(GRID_OTHER).to_numpy(np.uint8)
+    idx = np.arange(len(sorted_data))
+    xs = idx % cols
+    ys = idx // cols  # image row 0 is the top of the grid
+    
+    cells = np.full((rows, cols), GRID_WHITE, np.uint8)
+    cells[ys, xs] = category_ids
+    grid = np.repeat(np.repeat(cells, CELL_PX, axis=0), CELL_PX, axis=1)
+    grid[::CELL_PX, :] = GRID_WHITE
+    grid[:, CELL_PX - 1::CELL_PX] = GRID_WHITE
+    
+    ax.imshow(grid, cmap=GRID_CMAP, vmin=0, vmax=GRID_CMAP.N - 1,
+              interpolation='nearest', origin='upper', extent=(0, cols, 0, rows))
+    
+    # Add booth number for swing booths
+    is_swing = sorted_data['category'].str.contains('SWING').to_numpy()
+    for i, booth in zip(idx[is_swing], sorted_data['booth'][is_swing]):
+        x = i % cols
+        y = rows - 1 - (i // cols)
+        ax.text(x + 0.45, y + 0.45, booth[:3], ha='center', va='center', 
+               fontsize=5, color='white', fontweight='bold')
     
     ax.set_xlim(-0.5, cols + 0.5)
     ax.set_ylim(-0.5, rows + 0.5)
@@ -190,22 +235,21 @@ def create_booth_grid(data, output_path):
     ax.set_title('All 359 Booths - Sorted by Competitiveness\n(Most competitive at bottom-left)', 
                 fontsize=14, fontweight='bold', pad=20)
     
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close()
-    print(f"✅ Saved: {output_path}")
+    # The legend sits outside the axes
+    save_chart(fig, output_path, tight_bbox=True)
 
 
-def create_swing_focus_chart(data, output_path):
+def create_swing_focus_chart(data, output_path, fig):
     """Create focused chart on swing booths."""
-    swing_booths = [r for r in data if 'SWING' in r['category']]
-    swing_booths = sorted(swing_booths, key=lambda x: float(x['margin_pct']))[:30]
+    swing_booths = data[data['category'].str.contains('SWING')]
+    swing_booths = swing_booths.sort_values('margin_pct', kind='stable').head(30)
     
-    fig, ax = plt.subplots(figsize=(14, 8))
+    new_chart(fig, 14, 8)
+    ax = fig.subplots()
     
-    booths = [r['booth'][:8] for r in swing_booths]
-    margins = [float(r['margin_pct']) for r in swing_booths]
-    colors = [COLORS['DMK'] if r['winner'] == 'DMK' else COLORS['AIADMK'] for r in swing_booths]
+    booths = list(swing_booths['booth'].str[:8])
+    margins = list(swing_booths['margin_pct'])
+    colors = np.where(swing_booths['winner'] == 'DMK', COLORS['DMK'], COLORS['AIADMK'])
     
     bars = ax.barh(booths, margins, color=colors, edgecolor='black')
     
@@ -218,8 +262,8 @@ def create_swing_focus_chart(data, output_path):
                 fontsize=14, fontweight='bold')
     
     # Add margin labels
-    for bar, margin, row in zip(bars, margins, swing_booths):
-        label = f"{margin:.1f}% ({row['margin']} votes)"
+    for bar, margin, votes in zip(bars, margins, swing_booths['margin']):
+        label = f"{margin:.1f}% ({votes} votes)"
         ax.text(bar.get_width() + 0.1, bar.get_y() + bar.get_height()/2, 
                label, va='center', fontsize=8)
     
@@ -231,10 +275,7 @@ def create_swing_focus_chart(data, output_path):
     ax.grid(axis='x', alpha=0.3)
     ax.invert_yaxis()
     
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close()
-    print(f"✅ Saved: {output_path}")
+    save_chart(fig, output_path)
 
 
 def main():
@@ -256,10 +297,13 @@ def main():
     # Generate all charts
     print("🎨 Generating visualizations...\n")
     
-    create_pie_chart(data, charts_dir / "1_category_distribution.png")
-    create_margin_histogram(data, charts_dir / "2_margin_distribution.png")
-    create_booth_grid(data, charts_dir / "3_booth_grid.png")
-    create_swing_focus_chart(data, charts_dir / "4_swing_booths_focus.png")
+    # One figure, cleared and resized between charts
+    fig = plt.figure()
+    create_pie_chart(data, charts_dir / "1_category_distribution.png", fig)
+    create_margin_histogram(data, charts_dir / "2_margin_distribution.png", fig)
+    create_booth_grid(data, charts_dir / "3_booth_grid.png", fig)
+    create_swing_focus_chart(data, charts_dir / "4_swing_booths_focus.png", fig)
+    plt.close(fig)
     
     print(f"\n✨ All charts saved to: {charts_dir}")
 
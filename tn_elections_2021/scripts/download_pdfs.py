@@ -6,29 +6,100 @@ Download Form20 PDFs for Tamil Nadu Election constituencies.
 import json
 import os
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from urllib.request import urlretrieve
-from urllib.error import URLError, HTTPError
 
+import requests
 
-def download_pdf(url, output_path, max_retries=3):
-    """Download a PDF with retry logic."""
+
+MAX_WORKERS = 8
+
+# One requests.Session per worker thread, so each thread reuses its own keep-alive connection
+_local = threading.local()
+
+
+def get_session():
+    """Return this thread's HTTP session, creating it on first use."""
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def pdf_path_for(const, raw_data_dir):
+    """Output path for a constituency's PDF, e.g. AC028_alandur.pdf"""
+    filename = f"AC{const['ac_number']}_{const['name'].lower().replace(' ', '_')}.pdf"
+    return raw_data_dir / filename
+
+
+def remote_size(url):
+    """Content-Length from a HEAD request, or None if the server doesn't say."""
+    try:
+        response = get_session().head(url, allow_redirects=True, timeout=30)
+        response.raise_for_status()
+        length = response.headers.get('Content-Length')
+        return int(length) if length is not None else None
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def fetch_to_part(url, part_path):
+    """Stream url into part_path, resuming from whatever is already there."""
+    existing = part_path.stat().st_size if part_path.exists() else 0
+    headers = {'Range': f'bytes={existing}-'} if existing else {}
+    
+    with get_session().get(url, stream=True, headers=headers, timeout=60) as response:
+        if response.status_code == 416:
+            # Range starts at/after the end: the partial file is already complete
+            return
+        response.raise_for_status()
+        # 206 means the server honoured the Range; a plain 200 restarts from byte 0
+        mode = 'ab' if response.status_code == 206 else 'wb'
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+
+
+def download_pdf(const, raw_data_dir, max_retries=3):
+    """Download a constituency's PDF with retry and resume. Returns (ac_num, name, ok)."""
+    ac_num = const["ac_number"]
+    name = const["name"]
+    url = const["pdf_url"]
+    output_path = pdf_path_for(const, raw_data_dir)
+    part_path = output_path.with_suffix('.pdf.part')
+    
+    expected_size = remote_size(url)
+    
+    # Only a file whose size matches the server's counts as already downloaded
+    if output_path.exists():
+        if expected_size is None or output_path.stat().st_size == expected_size:
+            print(f"  [{ac_num}] ⊙ Already exists: {output_path.name}")
+            return ac_num, name, True
+        print(f"  [{ac_num}] Size mismatch for {output_path.name}, downloading again")
+    
     for attempt in range(max_retries):
         try:
-            print(f"  Downloading: {url}")
-            urlretrieve(url, output_path)
-            file_size = os.path.getsize(output_path)
-            print(f"  ✓ Downloaded: {file_size:,} bytes")
-            return True
-        except (URLError, HTTPError) as e:
-            print(f"  ✗ Attempt {attempt + 1} failed: {e}")
+            print(f"  [{ac_num}] Downloading: {url}")
+            fetch_to_part(url, part_path)
+            
+            file_size = part_path.stat().st_size
+            if expected_size is not None and file_size != expected_size:
+                if file_size > expected_size:
+                    part_path.unlink()  # can't resume from a corrupt partial
+                raise requests.RequestException(f"got {file_size:,} of {expected_size:,} bytes")
+            
+            # Atomic rename: output_path only ever holds a complete file
+            os.replace(part_path, output_path)
+            print(f"  [{ac_num}] ✓ Downloaded {name}: {file_size:,} bytes")
+            return ac_num, name, True
+        except (requests.RequestException, OSError) as e:
+            print(f"  [{ac_num}] ✗ Attempt {attempt + 1} failed: {e}")
             if attempt < max_retries - 1:
                 time.sleep(2)
             else:
-                print(f"  ✗ Failed after {max_retries} attempts")
-                return False
-    return False
+                print(f"  [{ac_num}] ✗ Failed after {max_retries} attempts")
+    return ac_num, name, False
 
 
 def main():
@@ -49,32 +120,21 @@ def main():
     constituencies = data.get("kanchipuram_area", [])
     print(f"Found {len(constituencies)} constituencies to download\n")
     
-    # Download each PDF
     success_count = 0
     failed = []
     
-    for const in constituencies:
-        ac_num = const["ac_number"]
-        name = const["name"]
-        url = const["pdf_url"]
-        
-        # Create filename
-        filename = f"AC{ac_num}_{name.lower().replace(' ', '_')}.pdf"
-        output_path = raw_data_dir / filename
-        
-        print(f"[{ac_num}] {name}")
-        
-        # Skip if already exists
-        if output_path.exists():
-            print(f"  ⊙ Already exists: {output_path.name}")
+    # Downloads are network-bound, so a thread pool overlaps them
+    print(f"Checking/downloading {len(constituencies)} PDFs ({min(MAX_WORKERS, len(constituencies))} at a time)")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        results = list(ex.map(download_pdf, constituencies, [raw_data_dir] * len(constituencies)))
+    
+    for ac_num, name, ok in results:
+        if ok:
             success_count += 1
         else:
-            if download_pdf(url, output_path):
-                success_count += 1
-            else:
-                failed.append((ac_num, name))
-        
-        print()  # Blank line between downloads
+            failed.append((ac_num, name))
+    
+    print()
     
     # Summary
     print("=" * 60)
@@ -4,13 +4,24 @@ TN Elections 2021 - Summary Analysis
 Analyzes booth-level data and creates summary reports with party-wise breakdowns.
 """
 
-import csv
 import json
 import re
 from pathlib import Path
 from collections import defaultdict
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
+import pandas as pd
 from tabulate import tabulate
 
+# Numba is optional; without it the NumPy version of the vote-totals kernel is used
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 
 # Constituency name lookup from filename pattern ACxxx
 CONSTITUENCY_LOOKUP = {
@@ -68,6 +79,9 @@ PARTY_MAPPINGS = {
     "ednepedni tn": "Independent",
 }
 
+# Booth rows read per chunk in analyze_constituency
+CHUNK_ROWS = 5000
+
 # Columns to exclude (these are total/grand total columns, not actual candidates)
 # They appear as candidateN without any party name suffix
 EXCLUDE_COLUMNS = {
@@ -78,7 +92,16 @@ EXCLUDE_COLUMNS = {
     'candidate_28', 'candidate_29', 'candidate_30'
 }
 
+# All PARTY_MAPPINGS patterns in one compiled regex. Each branch is ".*?pattern" anchored at the
+# start, so the first mapping (in dict order) found anywhere in the text wins, as with the old loop
+PARTY_NAMES = list(PARTY_MAPPINGS.values())
+PARTY_PATTERN = re.compile(
+    "|".join(f"(?:.*?({re.escape(pattern)}))" for pattern in PARTY_MAPPINGS),
+    re.DOTALL
+)
+
 
+@lru_cache(maxsize=None)
 def decode_party_name(raw_name):
     """Decode reversed party name to actual party name."""
     # Extract party name from column (remove candidate_ prefix and number)
@@ -92,9 +115,9 @@ def decode_party_name(raw_name):
         party_text = raw_name.lower().strip()
     
     # Check mappings
-    for pattern, party in PARTY_MAPPINGS.items():
-        if pattern in party_text:
-            return party
+    match = PARTY_PATTERN.match(party_text)
+    if match:
+        return PARTY_NAMES[match.lastindex - 1]
     
     # If contains "tnednepedni" anywhere, it's independent
     if "tnednepedni" in party_text or "ednepedni" in party_text:
@@ -103,6 +126,35 @@ def decode_party_name(raw_name):
     return "Other"
 
 
+def _vote_totals_numpy(votes, party_ids, num_parties):
+    candidate_totals = votes.sum(axis=0)
+    party_totals = np.zeros(num_parties, np.int64)
+    np.add.at(party_totals, party_ids, candidate_totals)
+    return candidate_totals, party_totals
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _vote_totals_numba(votes, party_ids, num_parties):
+        n, c = votes.shape
+        candidate_totals = np.zeros(c, np.int64)
+        # Row-major walk matches the C-ordered matrix from to_numpy()
+        for i in range(n):
+            for j in range(c):
+                candidate_totals[j] += votes[i, j]
+        party_totals = np.zeros(num_parties, np.int64)
+        for j in range(c):
+            party_totals[party_ids[j]] += candidate_totals[j]
+        return candidate_totals, party_totals
+
+
+def vote_totals(votes, party_ids, num_parties):
+    """Per-column and per-party sums of a (booths x candidates) int64 vote matrix."""
+    if NUMBA_AVAILABLE:
+        return _vote_totals_numba(votes, party_ids, num_parties)
+    return _vote_totals_numpy(votes, party_ids, num_parties)
+
+
 def get_constituency_from_filename(filepath):
     """Extract constituency number from filename like AC029_sriperumbudur_booths.csv"""
     match = re.search(r'AC(\d{3})', filepath.name)
@@ -113,16 +165,16 @@ def get_constituency_from_filename(filepath):
 
 def analyze_constituency(csv_path):
     """Analyze a single constituency CSV file."""
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    # Read in chunks so only CHUNK_ROWS booths are held in memory at a time
+    chunks = pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS)
+    first = next(chunks, None)
     
-    if not rows:
+    if first is None or first.empty:
         return None
     
     # Get constituency info from filename if data has UNKNOWN
-    const_num = rows[0].get('constituency_number', 'UNKNOWN')
-    const_name = rows[0].get('constituency_name', 'UNKNOWN')
+    const_num = first['constituency_number'].iloc[0] if 'constituency_number' in first.columns else 'UNKNOWN'
+    const_name = first['constituency_name'].iloc[0] if 'constituency_name' in first.columns else 'UNKNOWN'
     
     # Fix UNKNOWN constituency using filename
     if const_num == 'UNKNOWN' or const_name == 'UNKNOWN':
@@ -131,27 +183,31 @@ def analyze_constituency(csv_path):
             const_num = ac_num
             const_name = CONSTITUENCY_LOOKUP.get(ac_num, const_name)
     
-    # Count booths
-    num_booths = len(rows)
-    
     # Identify vote columns (skip metadata and total columns)
     metadata_cols = {'constituency_number', 'constituency_name', 'table_no', 'polling_station_no', 'note'}
-    vote_columns = [col for col in rows[0].keys() 
-                   if col not in metadata_cols and col not in EXCLUDE_COLUMNS]
-    
-    # Calculate votes per candidate and aggregate by party
-    candidate_votes = defaultdict(int)
-    party_votes = defaultdict(int)
-    
-    for row in rows:
-        for col in vote_columns:
-            try:
-                votes = int(row[col]) if row[col] else 0
-                candidate_votes[col] += votes
-                party = decode_party_name(col)
-                party_votes[party] += votes
-            except ValueError:
-                pass
+    drop_cols = [col for col in first.columns if col in metadata_cols or col in EXCLUDE_COLUMNS]
+    vote_columns = [col for col in first.columns if col not in drop_cols]
+    
+    # Decode each column's party once; factorize numbers parties in first-seen order, like the dict did
+    party_ids, parties = pd.factorize(pd.Index(vote_columns).map(decode_party_name))
+    party_ids = party_ids.astype(np.int64)
+    
+    num_booths = 0
+    candidate_totals = np.zeros(len(vote_columns), np.int64)
+    party_totals = np.zeros(len(parties), np.int64)
+    
+    for chunk in chain([first], chunks):
+        num_booths += len(chunk)
+        # Blank or non-numeric cells count as 0
+        votes = chunk[vote_columns].apply(pd.to_numeric, errors='coerce').fillna(0).astype(np.int64)
+        chunk_candidates, chunk_parties = vote_totals(
+            np.ascontiguousarray(votes.to_numpy()), party_ids, len(parties)
+        )
+        candidate_totals += chunk_candidates
+        party_totals += chunk_parties
+    
+    candidate_votes = {col: int(v) for col, v in zip(vote_columns, candidate_totals)}
+    party_votes = {party: int(v) for party, v in zip(parties, party_totals)}
     
     # Sort candidates by votes
     sorted_candidates = sorted(candidate_votes.items(), key=lambda x: x[1], reverse=True)
@@ -178,9 +234,9 @@ def analyze_constituency(csv_path):
             'votes': runner_up[1]
         },
         'margin': winner[1] - runner_up[1],
-        'party_votes': dict(party_votes),
+        'party_votes': party_votes,
         'total_votes': total_votes,
-        'candidate_votes': dict(candidate_votes)
+        'candidate_votes': candidate_votes
     }
 
 
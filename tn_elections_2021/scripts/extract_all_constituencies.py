@@ -6,73 +6,147 @@ Extract polling station locations from multiple constituency PDFs and prepare fo
 import pdfplumber
 import csv
 import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from pathlib import Path
 
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+from pdf_grid import RULE_TOLERANCE, grid_table
+
+
+# Settings for the pdfplumber fallback, resolved once. These are pdfplumber's defaults for a
+# ruled table, spelled out so the fallback matches what the grid reader assumes
+TABLE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": RULE_TOLERANCE,
+    "join_tolerance": RULE_TOLERANCE,
+    "intersection_tolerance": RULE_TOLERANCE,
+}
+
+# Village name: the text after the first comma in the building name
+VILLAGE_RE = re.compile(r',\s*([A-Za-z][A-Za-z\s]+)')
+# Serial-number cell
+IS_NUMBER = re.compile(r'\d+').fullmatch
+
+
+def iter_page_tables(pdf_path):
+    """
+    Yield each page's tables, using the pdfminer grid reader and falling back to
+    pdfplumber's extract_tables only for pages without a clean ruled grid.
+    """
+    rsrcmgr = PDFResourceManager()
+    # laparams=None: no layout analysis, just the raw chars and rects
+    device = PDFPageAggregator(rsrcmgr, laparams=None)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    plumber_pdf = None
+    
+    try:
+        with open(pdf_path, 'rb') as f:
+            for page_num, page in enumerate(PDFPage.get_pages(f)):
+                interpreter.process_page(page)
+                table = grid_table(device.get_result())
+                if table is not None:
+                    yield [table]
+                    continue
+                
+                if plumber_pdf is None:
+                    plumber_pdf = pdfplumber.open(pdf_path)
+                plumber_page = plumber_pdf.pages[page_num]
+                # A page without text can't hold a station row
+                if plumber_page.chars:
+                    tables = plumber_page.extract_tables(table_settings=TABLE_SETTINGS)
+                else:
+                    tables = []
+                plumber_page.flush_cache()
+                yield tables
+    finally:
+        if plumber_pdf is not None:
+            plumber_pdf.close()
+
 
 def extract_polling_stations(pdf_path, constituency_name):
     """Extract polling station data from PDF using table extraction."""
     stations = []
+    seen = set()  # sl_nos already taken; the first occurrence wins
+    address_suffix = f", {constituency_name}, Kanchipuram, Tamil Nadu, India"
     
-    with pdfplumber.open(pdf_path) as pdf:
-        print(f"  Processing {len(pdf.pages)} pages...")
-        
-        for page_num, page in enumerate(pdf.pages):
-            tables = page.extract_tables()
-            
-            for table in tables:
-                if not table:
+    for tables in iter_page_tables(pdf_path):
+        for table in tables:
+            if not table:
+                continue
+                
+            for row in table:
+                if not row or len(row) < 3:
                     continue
-                    
-                for row in table:
-                    if not row or len(row) < 3:
+                
+                # Skip header rows
+                first_col = str(row[0] or '').strip()
+                if first_col in ['Sl.No', 'Sl. No', 'S.No', ''] or not IS_NUMBER(first_col):
+                    continue
+                
+                try:
+                    sl_no = int(first_col)
+                    if sl_no in seen:
                         continue
                     
-                    # Skip header rows
-                    first_col = str(row[0] or '').strip()
-                    if first_col in ['Sl.No', 'Sl. No', 'S.No', ''] or not first_col.isdigit():
-                        continue
+                    station_no = row[1] if len(row) > 1 else ""
+                    building = row[2] if len(row) > 2 else ""
+                    polling_areas = row[3] if len(row) > 3 else ""
                     
-                    try:
-                        sl_no = int(first_col)
-                        station_no = row[1] if len(row) > 1 else ""
-                        building = row[2] if len(row) > 2 else ""
-                        polling_areas = row[3] if len(row) > 3 else ""
-                        
-                        # Skip if no building info
-                        if not building:
-                            continue
-                        
-                        # Clean building name
-                        building = str(building).replace('\n', ' ').strip()
-                        
-                        # Extract village name from building (after comma usually)
-                        village_match = re.search(r',\s*([A-Za-z][A-Za-z\s]+)', building)
-                        village = village_match.group(1).strip() if village_match else ""
-                        
-                        # Create search address
-                        search_address = f"{building}, {constituency_name}, Kanchipuram, Tamil Nadu, India"
-                        
-                        stations.append({
-                            'sl_no': sl_no,
-                            'station_no': str(station_no).strip() if station_no else str(sl_no),
-                            'building': building,
-                            'village': village,
-                            'search_address': search_address
-                        })
-                        
-                    except (ValueError, IndexError) as e:
+                    # Skip if no building info
+                    if not building:
                         continue
+                    
+                    # Clean building name
+                    building = str(building).replace('\n', ' ').strip()
+                    
+                    # Extract village name from building (after comma usually)
+                    village_match = VILLAGE_RE.search(building)
+                    village = village_match.group(1).strip() if village_match else ""
+                    
+                    # Create search address
+                    search_address = building + address_suffix
+                    
+                    seen.add(sl_no)
+                    stations.append({
+                        'sl_no': sl_no,
+                        'station_no': str(station_no).strip() if station_no else str(sl_no),
+                        'building': building,
+                        'village': village,
+                        'search_address': search_address
+                    })
+                    
+                except (ValueError, IndexError) as e:
+                    continue
     
-    # Remove duplicates based on sl_no
-    seen = set()
-    unique_stations = []
-    for s in stations:
-        if s['sl_no'] not in seen:
-            seen.add(s['sl_no'])
-            unique_stations.append(s)
+    return sorted(stations, key=itemgetter('sl_no'))
+
+
+def process_one(args):
+    """Worker for the process pool: extract one constituency's stations."""
+    pdf_name, const_name, ac_number, raw_data_dir = args
+    pdf_path = raw_data_dir / pdf_name
+    
+    if not pdf_path.exists():
+        return {'const_name': const_name, 'ac_number': ac_number, 'pdf_path': pdf_path, 'stations': None}
+    
+    with pdfplumber.open(pdf_path) as pdf:
+        num_pages = len(pdf.pages)
     
-    return sorted(unique_stations, key=lambda x: x['sl_no'])
+    stations = extract_polling_stations(pdf_path, const_name)
+    return {
+        'const_name': const_name,
+        'ac_number': ac_number,
+        'pdf_path': pdf_path,
+        'num_pages': num_pages,
+        'stations': stations
+    }
 
 
 def main():
@@ -87,16 +161,22 @@ def main():
         ("kancheepuram_polling_stations.pdf", "Kancheepuram", "037"),
     ]
     
-    for pdf_name, const_name, ac_number in constituencies:
-        pdf_path = raw_data_dir / pdf_name
+    # PDFs are independent and parsing is CPU-bound, so extract them in parallel;
+    # results come back in order and the JSON files are written here in the parent
+    work = [(pdf_name, const_name, ac_number, raw_data_dir) for pdf_name, const_name, ac_number in constituencies]
+    with ProcessPoolExecutor(max_workers=min(len(work), os.cpu_count() or 1)) as ex:
+        results = list(ex.map(process_one, work))
+    
+    for result in results:
+        const_name = result['const_name']
+        stations = result['stations']
         
-        if not pdf_path.exists():
-            print(f"❌ PDF not found: {pdf_path}")
+        if stations is None:
+            print(f"❌ PDF not found: {result['pdf_path']}")
             continue
         
-        print(f"\n📄 Processing {const_name} (AC{ac_number})...")
-        
-        stations = extract_polling_stations(pdf_path, const_name)
+        print(f"\n📄 Processing {const_name} (AC{result['ac_number']})...")
+        print(f"  Processing {result['num_pages']} pages...")
         
         if not stations:
             print(f"  ⚠️ No stations extracted")
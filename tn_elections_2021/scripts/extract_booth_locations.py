@@ -10,16 +10,40 @@ import json
 import re
 from pathlib import Path
 
+# orjson is optional and much faster; the json fallback writes the same indented JSON,
+# except that orjson writes NaN/Infinity as null
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Village name: the first word after a comma in the building name
+VILLAGE_RE = re.compile(r',\s*([A-Za-z]+)')
+
+
+def dump_json(obj, path):
+    """Write obj as indented JSON, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+
 
 def extract_polling_stations(pdf_path):
     """Extract polling station data from PDF using table extraction."""
-    stations = []
+    stations = {}  # station_no -> station; the first row seen for a station wins
     
     with pdfplumber.open(pdf_path) as pdf:
         print(f"Processing {len(pdf.pages)} pages...")
         
         for page_num, page in enumerate(pdf.pages):
             tables = page.extract_tables()
+            # Drop the page's cached layout/chars; pdfplumber otherwise keeps them for every page
+            page.close()
             
             for table in tables:
                 for row in table:
@@ -41,39 +65,34 @@ def extract_polling_stations(pdf_path):
                             continue
                         if not sl_no.isdigit():
                             continue
+                        station_no = int(station_no)
+                        if station_no in stations:
+                            continue
                             
                         # Clean building name
                         building = building.replace('\n', ' ').strip() if building else ""
                         
                         # Extract village name from building
-                        village_match = re.search(r',\s*([A-Za-z]+)', building)
+                        village_match = VILLAGE_RE.search(building)
                         village = village_match.group(1) if village_match else ""
                         
                         # Create search address for geocoding
                         # Format: "Building Name, Village, Uthiramerur, Kanchipuram, Tamil Nadu"
                         search_address = f"{building}, Uthiramerur, Kanchipuram, Tamil Nadu, India"
                         
-                        stations.append({
-                            'station_no': int(station_no),
+                        stations[station_no] = {
+                            'station_no': station_no,
                             'building': building,
                             'village': village,
                             'polling_areas': polling_areas.replace('\n', ' ') if polling_areas else "",
                             'voter_type': voter_type.strip() if voter_type else "All Voters",
                             'search_address': search_address
-                        })
+                        }
                         
                     except (ValueError, IndexError) as e:
                         continue
     
-    # Remove duplicates based on station_no
-    seen = set()
-    unique_stations = []
-    for s in stations:
-        if s['station_no'] not in seen:
-            seen.add(s['station_no'])
-            unique_stations.append(s)
-    
-    return sorted(unique_stations, key=lambda x: x['station_no'])
+    return [stations[station_no] for station_no in sorted(stations)]
 
 
 def save_data(stations, base_dir):
@@ -82,21 +101,17 @@ def save_data(stations, base_dir):
     # CSV
     csv_path = base_dir / "data" / "uthiramerur_polling_stations.csv"
     with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['station_no', 'building', 'village', 'search_address'])
-        writer.writeheader()
-        for s in stations:
-            writer.writerow({
-                'station_no': s['station_no'],
-                'building': s['building'],
-                'village': s['village'],
-                'search_address': s['search_address']
-            })
+        writer = csv.writer(f)
+        writer.writerow(['station_no', 'building', 'village', 'search_address'])
+        writer.writerows(
+            (s['station_no'], s['building'], s['village'], s['search_address'])
+            for s in stations
+        )
     print(f"✅ Saved CSV: {csv_path}")
     
     # JSON
     json_path = base_dir / "data" / "uthiramerur_polling_stations.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(stations, f, indent=2, ensure_ascii=False)
+    dump_json(stations, json_path)
     print(f"✅ Saved JSON: {json_path}")
 
 
@@ -4,18 +4,34 @@ Extract booth-level voting data from Form20 PDFs (both text and image-based) to
 Handles OCR for scanned PDFs.
 """
 
+import io
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
 import csv
 import re
 
 try:
     import pdfplumber
+    from pdfminer.converter import PDFPageAggregator
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
 except ImportError:
     print("Error: pdfplumber not installed. Run: pip3 install pdfplumber")
     sys.exit(1)
 
+from pdf_grid import grid_table
+
+# PyMuPDF is optional; it checks page 1 for text/images without pdfminer's layout analysis
+try:
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
 # OCR imports (optional, for image-based PDFs)
 try:
     import pytesseract
@@ -27,12 +43,24 @@ except ImportError:
     print("To enable OCR: pip3 install pytesseract pdf2image pillow")
     print("Also install tesseract: brew install tesseract")
 
+# Constituency heading on page 1, e.g. "036- Uthiramerur"
+CONST_RE = re.compile(r'(\d{3})-\s*([A-Za-z\s\(\)]+)')
+ELECTORS_RE = re.compile(r'Total No\. of Electors.*?(\d+)')
+
 
-def is_image_based_pdf(pdf):
+def is_image_based_pdf(pdf_path):
     """Check if PDF is image-based (scanned) rather than text-based."""
-    first_page = pdf.pages[0]
-    has_text = bool(first_page.extract_text())
-    has_images = len(first_page.images) > 0
+    if PYMUPDF_AVAILABLE:
+        with pymupdf.open(pdf_path) as doc:
+            first_page = doc[0]
+            has_text = bool(first_page.get_text())
+            has_images = len(first_page.get_images()) > 0
+    else:
+        with pdfplumber.open(pdf_path) as pdf:
+            first_page = pdf.pages[0]
+            # The raw chars are enough to know there is text; extract_text() would lay it all out
+            has_text = len(first_page.chars) > 0
+            has_images = len(first_page.images) > 0
     
     return not has_text and has_images
 
@@ -43,7 +71,7 @@ def extract_constituency_info(pdf):
     text = first_page.extract_text()
     
     # Extract constituency name (pattern: "036- Uthiramerur")
-    const_match = re.search(r'(\d{3})-\s*([A-Za-z\s\(\)]+)', text)
+    const_match = CONST_RE.search(text)
     if const_match:
         ac_number = const_match.group(1)
         ac_name = const_match.group(2).strip()
@@ -52,7 +80,7 @@ def extract_constituency_info(pdf):
         ac_name = "UNKNOWN"
     
     # Extract total electors
-    electors_match = re.search(r'Total No\. of Electors.*?(\d+)', text)
+    electors_match = ELECTORS_RE.search(text)
     total_electors = electors_match.group(1) if electors_match else "UNKNOWN"
     
     return ac_number, ac_name, total_electors
@@ -89,23 +117,49 @@ def extract_candidate_headers(table):
     return candidates
 
 
+def iter_page_tables(pdf, pdf_path):
+    """
+    Yield each page's tables. Page 1 goes through pdfplumber since its merged header
+    cells hold the candidate names; later pages are read with the pdfminer grid reader,
+    falling back to pdfplumber for any page without a clean ruled grid.
+    """
+    rsrcmgr = PDFResourceManager()
+    # laparams=None: no layout analysis, just the raw chars and rects
+    device = PDFPageAggregator(rsrcmgr, laparams=None)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    
+    with open(pdf_path, 'rb') as f:
+        for page, layout_page in zip(pdf.pages, PDFPage.get_pages(f)):
+            table = None
+            if page.page_number > 1:
+                interpreter.process_page(layout_page)
+                table = grid_table(device.get_result())
+            
+            if table is not None:
+                yield [table]
+            else:
+                yield page.extract_tables()
+            # Drop the page's cached layout/chars; pdfplumber otherwise keeps them for every page
+            page.close()
+
+
 def extract_booth_data_text_pdf(pdf_path, output_csv):
     """Extract booth data from text-based PDF."""
     
-    with pdfplumber.open(pdf_path) as pdf:
+    with pdfplumber.open(pdf_path) as pdf, open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
         # Get constituency info
         ac_number, ac_name, total_electors = extract_constituency_info(pdf)
         print(f"  Constituency: {ac_number} - {ac_name}")
         print(f"  Total Electors: {total_electors}")
         print(f"  Pages: {len(pdf.pages)}")
         
-        all_rows = []
+        writer = csv.writer(csvfile)
+        header = ['constituency_number', 'constituency_name', 'table_no', 'polling_station_no']
+        row_count = 0
         candidate_headers = None
         
-        # Process each page
-        for page_num, page in enumerate(pdf.pages, 1):
-            tables = page.extract_tables()
-            
+        # Process each page, writing rows as they come so only one page is held at a time
+        for page_num, tables in enumerate(iter_page_tables(pdf, pdf_path), 1):
             if not tables:
                 continue
             
@@ -117,6 +171,7 @@ def extract_booth_data_text_pdf(pdf_path, output_csv):
             
             # Process data rows (skip header rows)
             start_row = 4 if page_num == 1 else 1
+            page_rows = []
             
             for row in table[start_row:]:
                 if not row or len(row) < 3:
@@ -128,41 +183,30 @@ def extract_booth_data_text_pdf(pdf_path, output_csv):
                         continue
                     continue
                 
-                # Clean the row
-                cleaned_row = []
-                for cell in row:
-                    if cell is None:
-                        cleaned_row.append('')
-                    else:
-                        cleaned_row.append(str(cell).strip())
-                
-                all_rows.append(cleaned_row)
-        
-        print(f"  Extracted {len(all_rows)} booth records")
-        
-        # Write to CSV
-        with open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
+                # Clean the row (cells are str, or None for merged/empty cells)
+                page_rows.append([ac_number, ac_name] + ['' if cell is None else cell.strip() for cell in row])
             
-            # Create header
-            header = ['constituency_number', 'constituency_name', 'table_no', 'polling_station_no']
+            if not page_rows:
+                continue
             
-            if all_rows:
-                num_data_cols = len(all_rows[0])
-                for i in range(2, num_data_cols):
+            # Header columns follow the first data row's width
+            if row_count == 0:
+                for i in range(2, len(page_rows[0]) - 2):
                     if i < len(candidate_headers) + 2:
                         header.append(candidate_headers[i-2])
                     else:
                         header.append(f'col_{i}')
+                writer.writerow(header)
             
+            writer.writerows(page_rows)
+            row_count += len(page_rows)
+        
+        if row_count == 0:
             writer.writerow(header)
-            
-            # Write data rows
-            for row in all_rows:
-                output_row = [ac_number, ac_name] + row
-                writer.writerow(output_row)
         
-        return len(all_rows), ac_number, ac_name
+        print(f"  Extracted {row_count} booth records")
+        
+        return row_count, ac_number, ac_name
 
 
 def extract_booth_data_image_pdf(pdf_path, output_csv, ac_number_fallback, ac_name_fallback):
@@ -190,45 +234,30 @@ def extract_booth_data(pdf_path, output_csv, ac_number_fallback="UNKNOWN", ac_na
     
     print(f"Processing: {pdf_path.name}")
     
-    with pdfplumber.open(pdf_path) as pdf:
-        if is_image_based_pdf(pdf):
-            return extract_booth_data_image_pdf(pdf_path, output_csv, ac_number_fallback, ac_name_fallback)
-        else:
-            return extract_booth_data_text_pdf(pdf_path, output_csv)
+    if is_image_based_pdf(pdf_path):
+        return extract_booth_data_image_pdf(pdf_path, output_csv, ac_number_fallback, ac_name_fallback)
+    else:
+        return extract_booth_data_text_pdf(pdf_path, output_csv)
 
 
-def main():
-    # Setup paths
-    base_dir = Path(__file__).parent.parent
-    raw_data_dir = base_dir / "raw_data"
-    extracted_dir = base_dir / "extracted"
-    data_dir = base_dir / "data"
-    
-    # Load constituency metadata
-    constituencies_file = data_dir / "constituencies.json"
-    with open(constituencies_file, 'r') as f:
-        data = json.load(f)
-    
-    constituencies = data.get("kanchipuram_area", [])
+def process_one(args):
+    """
+    Worker for the process pool: extract one constituency's Form20 to CSV.
+    Returns (booth_count, text_based, image_based, log), with the worker's prints in log.
+    """
+    const, raw_data_dir, extracted_dir, raw_pdfs = args
+    ac_num = const["ac_number"]
+    name = const["name"]
     
-    print(f"Extracting data from {len(constituencies)} constituencies\n")
-    print("=" * 60)
-    
-    total_booths = 0
-    text_based_count = 0
-    image_based_count = 0
-    
-    for const in constituencies:
-        ac_num = const["ac_number"]
-        name = const["name"]
-        
+    log = io.StringIO()
+    with redirect_stdout(log):
         # Find PDF file
         pdf_filename = f"AC{ac_num}_{name.lower().replace(' ', '_')}.pdf"
         pdf_path = raw_data_dir / pdf_filename
         
-        if not pdf_path.exists():
+        if pdf_filename not in raw_pdfs:
             print(f"✗ PDF not found: {pdf_filename}\n")
-            continue
+            return 0, 0, 0, log.getvalue()
         
         # Output CSV
         csv_filename = f"AC{ac_num}_{name.lower().replace(' ', '_')}_booths.csv"
@@ -236,19 +265,56 @@ def main():
         
         try:
             booth_count, _, _ = extract_booth_data(pdf_path, output_csv, ac_num, name)
-            total_booths += booth_count
             
             if booth_count > 0:
-                text_based_count += 1
                 print(f"  ✓ Saved to: {output_csv.name}\n")
-            else:
-                image_based_count += 1
-                print(f"  ⊙ Placeholder created (OCR needed): {output_csv.name}\n")
+                return booth_count, 1, 0, log.getvalue()
+            
+            print(f"  ⊙ Placeholder created (OCR needed): {output_csv.name}\n")
+            return booth_count, 0, 1, log.getvalue()
                 
         except Exception as e:
             print(f"✗ Error processing {pdf_filename}: {e}\n")
             import traceback
             traceback.print_exc()
+            return 0, 0, 0, log.getvalue()
+
+
+def main():
+    # Setup paths
+    base_dir = Path(__file__).parent.parent
+    raw_data_dir = base_dir / "raw_data"
+    extracted_dir = base_dir / "extracted"
+    data_dir = base_dir / "data"
+    
+    # Load constituency metadata
+    constituencies_file = data_dir / "constituencies.json"
+    with open(constituencies_file, 'r') as f:
+        data = json.load(f)
+    
+    constituencies = data.get("kanchipuram_area", [])
+    
+    print(f"Extracting data from {len(constituencies)} constituencies\n")
+    print("=" * 60)
+    
+    # One directory listing instead of a stat per constituency
+    raw_pdfs = frozenset(entry.name for entry in os.scandir(raw_data_dir) if entry.name.endswith('.pdf'))
+    
+    # PDFs are independent and parsing is CPU-bound, so extract them in parallel;
+    # each worker's output is captured and printed here in the original order
+    work = [(const, raw_data_dir, extracted_dir, raw_pdfs) for const in constituencies]
+    with ProcessPoolExecutor(max_workers=max(1, min(len(work), os.cpu_count() or 1))) as ex:
+        results = list(ex.map(process_one, work))
+    
+    total_booths = 0
+    text_based_count = 0
+    image_based_count = 0
+    
+    for booth_count, text_based, image_based, log in results:
+        print(log, end='')
+        total_booths += booth_count
+        text_based_count += text_based
+        image_based_count += image_based
     
     print("=" * 60)
     print(f"Extraction Complete!")
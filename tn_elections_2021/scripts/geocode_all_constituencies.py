@@ -3,16 +3,15 @@
 Geocode polling stations for multiple constituencies using Nominatim.
 """
 
+import asyncio
 import json
-import time
-import requests
+import os
+import aiohttp
 from pathlib import Path
 
-
-NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
-HEADERS = {
-    'User-Agent': 'TN-Elections-Analysis/1.0 (educational project)'
-}
+from geocode_common import (
+    HEADERS, REQUEST_INTERVAL, AsyncRateLimiter, NominatimCache, dump_json, geocode_address
+)
 
 # Default centers for fallback
 CONSTITUENCY_CENTERS = {
@@ -23,68 +22,67 @@ CONSTITUENCY_CENTERS = {
 }
 
 
-def geocode_address(address, retries=2):
-    """Geocode a single address using Nominatim."""
-    params = {
-        'q': address,
-        'format': 'json',
-        'limit': 1,
-        'countrycodes': 'in'
-    }
+async def geocode_station(session, limiter, cache, address_lookup, village_lookups, const_name, village, label):
+    """Geocode one station: full address first, then its village (shared across stations)."""
+    # Try full address first (the lookup may be shared with stations at the same address)
+    result = await address_lookup
     
-    for attempt in range(retries):
-        try:
-            response = requests.get(NOMINATIM_URL, params=params, headers=HEADERS, timeout=10)
-            response.raise_for_status()
-            
-            results = response.json()
-            if results:
-                return {
-                    'lat': float(results[0]['lat']),
-                    'lng': float(results[0]['lon']),
-                    'found': True
-                }
-            return None
-            
-        except Exception as e:
-            if attempt < retries - 1:
-                time.sleep(2)
-            else:
-                return None
+    # If not found, try village-level; concurrent stations in the same village await one lookup
+    if not result and village:
+        if village not in village_lookups:
+            village_address = f"{village}, {const_name}, Kanchipuram, Tamil Nadu, India"
+            village_lookups[village] = asyncio.ensure_future(geocode_address(session, limiter, cache, village_address))
+        result = await village_lookups[village]
     
-    return None
+    if result:
+        print(f"{label} ✓ ({result['lat']:.4f}, {result['lng']:.4f})", flush=True)
+    else:
+        print(f"{label} ✗ (fallback)", flush=True)
+    return result
 
 
-def geocode_constituency(const_name, stations, output_path, center):
+async def geocode_constituency(const_name, stations, output_path, center, cache):
     """Geocode all stations for a constituency."""
     geocoded = []
     success_count = 0
-    village_cache = {}
+    village_lookups = {}  # village -> lookup task, so each village is requested once
     
     print(f"\n🗺️  Geocoding {len(stations)} stations for {const_name}...")
-    print("   (Using Nominatim with 1s delay between requests)\n")
+    print(f"   (Using Nominatim, one request every {REQUEST_INTERVAL}s over a keep-alive session)")
     
+    rows = []
     for i, station in enumerate(stations):
         station_no = station.get('station_no', station.get('sl_no', i+1))
         building = station.get('building', '')
         village = station.get('village', '')
         search_address = station.get('search_address', f"{building}, {const_name}, Tamil Nadu, India")
+        rows.append((station_no, building, village, search_address))
+    
+    # Requests still start at most once per REQUEST_INTERVAL, but one persistent session reuses the
+    # TLS connection and response reads/decoding overlap the wait for the next slot
+    limiter = AsyncRateLimiter(REQUEST_INTERVAL)
+    connector = aiohttp.TCPConnector(limit=4, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS, timeout=timeout) as session:
+        # Stations often repeat an address up to case/spacing; request each distinct one once
+        address_lookups = {}
+        row_lookups = []
+        for _, _, _, search_address in rows:
+            key = NominatimCache.key(search_address)
+            if key not in address_lookups:
+                address_lookups[key] = asyncio.ensure_future(geocode_address(session, limiter, cache, search_address))
+            row_lookups.append(address_lookups[key])
+        print(f"   ({len(address_lookups)} distinct addresses)\n")
         
-        print(f"[{i+1}/{len(stations)}] Station {station_no}: {building[:35]}...", end=" ", flush=True)
-        
-        # Try full address first
-        result = geocode_address(search_address)
-        
-        # If not found, try village-level
-        if not result and village:
-            if village in village_cache:
-                result = village_cache[village]
-            else:
-                village_address = f"{village}, {const_name}, Kanchipuram, Tamil Nadu, India"
-                result = geocode_address(village_address)
-                if result:
-                    village_cache[village] = result
-        
+        results = await asyncio.gather(*[
+            geocode_station(
+                session, limiter, cache, address_lookup, village_lookups, const_name, village,
+                f"[{i+1}/{len(rows)}] Station {station_no}: {building[:35]}..."
+            )
+            for i, ((station_no, building, village, _), address_lookup) in enumerate(zip(rows, row_lookups))
+        ])
+    
+    for (station_no, building, village, _), result in zip(rows, results):
         if result:
             geocoded.append({
                 'station_no': station_no,
@@ -95,7 +93,6 @@ def geocode_constituency(const_name, stations, output_path, center):
                 'found': True
             })
             success_count += 1
-            print(f"✓ ({result['lat']:.4f}, {result['lng']:.4f})")
         else:
             # Use constituency center as fallback
             geocoded.append({
@@ -106,14 +103,9 @@ def geocode_constituency(const_name, stations, output_path, center):
                 'lng': center[1],
                 'found': False
             })
-            print("✗ (fallback)")
-        
-        # Rate limiting
-        time.sleep(1.1)
     
     # Save results
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(geocoded, f, indent=2, ensure_ascii=False)
+    dump_json(geocoded, output_path)
     
     print(f"\n✅ Geocoded {success_count}/{len(stations)} stations successfully")
     print(f"📁 Saved to: {output_path}")
@@ -125,30 +117,39 @@ def main():
     base_dir = Path(__file__).parent.parent
     data_dir = base_dir / "data"
     
+    # One directory listing for all the input/output existence checks
+    data_files = {entry.name for entry in os.scandir(data_dir)}
+    
     constituencies = [
         ("alandur", "028"),
         ("sriperumbudur", "029"),
         ("kancheepuram", "037"),
     ]
     
-    for const_name, ac_number in constituencies:
-        input_path = data_dir / f"{const_name}_polling_stations.json"
-        output_path = data_dir / f"{const_name}_booths_geocoded.json"
-        
-        if not input_path.exists():
-            print(f"❌ Input not found: {input_path}")
-            continue
-        
-        # Skip if already geocoded
-        if output_path.exists():
-            print(f"⏭️  Skipping {const_name} (already geocoded)")
-            continue
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            stations = json.load(f)
-        
-        center = CONSTITUENCY_CENTERS.get(const_name, (12.8, 79.8))
-        geocode_constituency(const_name, stations, output_path, center)
+    # Shared across constituencies and reruns
+    cache = NominatimCache(data_dir / "geocode_cache.sqlite")
+    try:
+        for const_name, ac_number in constituencies:
+            input_path = data_dir / f"{const_name}_polling_stations.json"
+            output_path = data_dir / f"{const_name}_booths_geocoded.json"
+            
+            if input_path.name not in data_files:
+                print(f"❌ Input not found: {input_path}")
+                continue
+            
+            # Skip if already geocoded
+            if output_path.name in data_files:
+                print(f"⏭️  Skipping {const_name} (already geocoded)")
+                continue
+            
+            with open(input_path, 'r', encoding='utf-8') as f:
+                stations = json.load(f)
+            
+            center = CONSTITUENCY_CENTERS.get(const_name, (12.8, 79.8))
+            asyncio.run(geocode_constituency(const_name, stations, output_path, center, cache))
+    finally:
+        # Commits whatever was looked up, even if the run is interrupted
+        cache.close()
 
 
 if __name__ == "__main__":
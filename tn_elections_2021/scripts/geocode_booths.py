@@ -4,96 +4,98 @@ Geocode polling station addresses using Nominatim (OpenStreetMap).
 Free service with 1 request/second rate limit.
 """
 
+import asyncio
 import json
-import time
 import csv
-import requests
+import aiohttp
 from pathlib import Path
 from urllib.parse import quote
 
-
-NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
-HEADERS = {
-    'User-Agent': 'TN-Elections-Analysis/1.0 (educational project)'
-}
+from geocode_common import (
+    HEADERS, REQUEST_INTERVAL, AsyncRateLimiter, NominatimCache, dump_json, geocode_address
+)
 
 # Default center of Uthiramerur for fallback
 UTHIRAMERUR_CENTER = (12.4850, 79.8960)
 
 
-def geocode_address(address, retries=2):
-    """Geocode a single address using Nominatim."""
-    params = {
-        'q': address,
-        'format': 'json',
-        'limit': 1,
-        'countrycodes': 'in'
-    }
-    
-    for attempt in range(retries):
-        try:
-            response = requests.get(NOMINATIM_URL, params=params, headers=HEADERS, timeout=10)
-            response.raise_for_status()
-            
-            results = response.json()
-            if results:
-                return {
-                    'lat': float(results[0]['lat']),
-                    'lng': float(results[0]['lon']),
-                    'display_name': results[0].get('display_name', ''),
-                    'found': True
-                }
-            return None
-            
-        except Exception as e:
-            if attempt < retries - 1:
-                time.sleep(2)
-            else:
-                print(f"  Error geocoding: {e}")
-                return None
-    
-    return None
-
-
-def geocode_village(village):
+async def geocode_village(session, limiter, cache, village):
     """Try to geocode just the village name + Uthiramerur."""
     if not village:
         return None
     
     address = f"{village}, Uthiramerur, Kanchipuram, Tamil Nadu, India"
-    return geocode_address(address)
+    return await geocode_address(session, limiter, cache, address)
 
 
-def geocode_all_stations(stations, output_path):
+async def geocode_station(session, limiter, cache, address_lookup, village_lookups, station, label):
+    """Geocode one station: full address first, then its village (shared across stations)."""
+    note = ""
+    
+    # Try full address first (the lookup may be shared with stations at the same address)
+    result = await address_lookup
+    
+    # If not found, try village-level; concurrent stations in the same village await one lookup
+    village = station['village']
+    if not result and village:
+        if village in village_lookups:
+            note = "(cached village) "
+        else:
+            village_lookups[village] = asyncio.ensure_future(geocode_village(session, limiter, cache, village))
+        result = await village_lookups[village]
+        if result and not note:
+            note = "(village) "
+    
+    if result:
+        print(f"{label} {note}✓ ({result['lat']:.4f}, {result['lng']:.4f})")
+    else:
+        print(f"{label} ✗ (using fallback)")
+    return result
+
+
+async def geocode_all_stations(stations, output_path, cache_path):
     """Geocode all polling stations."""
     geocoded = []
     success_count = 0
-    village_cache = {}  # Cache village-level geocoding
+    village_lookups = {}  # village -> lookup task, so each village is requested once
     
     print(f"\n🗺️  Geocoding {len(stations)} polling stations...")
-    print("   (Using Nominatim with 1s delay between requests)\n")
+    print(f"   (Using Nominatim, one request every {REQUEST_INTERVAL}s over a keep-alive session)")
+    
+    # Requests still start at most once per REQUEST_INTERVAL, but one persistent session reuses the
+    # TLS connection and response reads/decoding overlap the wait for the next slot
+    limiter = AsyncRateLimiter(REQUEST_INTERVAL)
+    cache = NominatimCache(cache_path)
+    connector = aiohttp.TCPConnector(limit=4, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=10)
+    try:
+        async with aiohttp.ClientSession(connector=connector, headers=HEADERS, timeout=timeout) as session:
+            # Stations often repeat an address up to case/spacing; request each distinct one once
+            address_lookups = {}
+            station_lookups = []
+            for station in stations:
+                address = station.get('search_address', '')
+                key = NominatimCache.key(address)
+                if key not in address_lookups:
+                    address_lookups[key] = asyncio.ensure_future(geocode_address(session, limiter, cache, address))
+                station_lookups.append(address_lookups[key])
+            print(f"   ({len(address_lookups)} distinct addresses)\n")
+            
+            results = await asyncio.gather(*[
+                geocode_station(
+                    session, limiter, cache, address_lookup, village_lookups, station,
+                    f"[{i+1}/{len(stations)}] Station {station['station_no']}: {station['building'][:40]}..."
+                )
+                for i, (station, address_lookup) in enumerate(zip(stations, station_lookups))
+            ])
+    finally:
+        # Commits whatever was looked up, even if the run is interrupted
+        cache.close()
     
-    for i, station in enumerate(stations):
+    for station, result in zip(stations, results):
         station_no = station['station_no']
         building = station['building']
         village = station['village']
-        search_address = station.get('search_address', '')
-        
-        print(f"[{i+1}/{len(stations)}] Station {station_no}: {building[:40]}...", end=" ")
-        
-        # Try full address first
-        result = geocode_address(search_address)
-        
-        # If not found, try village-level
-        if not result and village:
-            if village in village_cache:
-                result = village_cache[village]
-                print("(cached village)", end=" ")
-            else:
-                result = geocode_village(village)
-                if result:
-                    village_cache[village] = result
-                    print("(village)", end=" ")
         
         if result:
             geocoded.append({
@@ -106,7 +108,6 @@ def geocode_all_stations(stations, output_path):
                 'found': True
             })
             success_count += 1
-            print(f"✓ ({result['lat']:.4f}, {result['lng']:.4f})")
         else:
             # Use village center or constituency center as fallback
             geocoded.append({
@@ -118,14 +119,9 @@ def geocode_all_stations(stations, output_path):
                 'geocode_source': 'fallback',
                 'found': False
             })
-            print("✗ (using fallback)")
-        
-        # Rate limiting - 1 request per second
-        time.sleep(1.1)
     
     # Save results
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(geocoded, f, indent=2, ensure_ascii=False)
+    dump_json(geocoded, output_path)
     
     print(f"\n✅ Geocoded {success_count}/{len(stations)} stations successfully")
     print(f"📁 Saved to: {output_path}")
@@ -137,6 +133,7 @@ def main():
     base_dir = Path(__file__).parent.parent
     input_path = base_dir / "data" / "uthiramerur_polling_stations.json"
     output_path = base_dir / "data" / "uthiramerur_booths_geocoded.json"
+    cache_path = base_dir / "data" / "geocode_cache.sqlite"
     
     if not input_path.exists():
         print(f"❌ Input file not found: {input_path}")
@@ -149,7 +146,7 @@ def main():
     print(f"📄 Loaded {len(stations)} stations from {input_path}")
     
     # Geocode all
-    geocoded = geocode_all_stations(stations, output_path)
+    geocoded = asyncio.run(geocode_all_stations(stations, output_path, cache_path))
     
     # Show summary
     found = sum(1 for s in geocoded if s['found'])
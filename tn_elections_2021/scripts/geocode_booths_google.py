@@ -4,9 +4,13 @@ Geocode polling station addresses using Google Maps Geocoding API.
 API key is loaded from .env file for security.
 """
 
+import atexit
 import json
+import sys
 import time
 import os
+import random
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Load environment variables from .env file
@@ -23,9 +27,36 @@ def load_env():
 load_env()
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from geocode_common import GoogleGeocodeCache
 
 GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 
+# Throttling and transient server errors are retried by the session itself, with jittered
+# exponential backoff (or the server's Retry-After), so parallel lookups don't retry in lockstep
+HTTP_RETRY = Retry(
+    total=5,
+    backoff_factor=0.2,
+    backoff_jitter=0.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+# One keep-alive session for every request, so the TLS connection to Google is reused
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=HTTP_RETRY))
+atexit.register(SESSION.close)
+
+# OVER_QUERY_LIMIT comes back as HTTP 200, so it is retried here: base * 2**attempt plus jitter
+OVER_QUERY_LIMIT_RETRIES = 5
+OVER_QUERY_LIMIT_BACKOFF = 0.1
+
+# Concurrent village lookups; well under the Geocoding API's 50 requests/second
+MAX_WORKERS = 10
+
 # Default center of Uthiramerur for fallback
 UTHIRAMERUR_CENTER = (12.4850, 79.8960)
 
@@ -44,57 +75,73 @@ def get_api_key():
     return key
 
 
-def geocode_address(address, api_key, retries=2):
-    """Geocode a single address using Google Maps."""
+def geocode_address(address, api_key, cache=None):
+    """Geocode a single address using Google Maps, via the on-disk cache when given."""
+    if cache is not None:
+        hit, cached = cache.get(address)
+        if hit:
+            return cached
+    
     params = {
         'address': address,
         'key': api_key,
         'region': 'in'
     }
     
-    for attempt in range(retries):
+    for attempt in range(OVER_QUERY_LIMIT_RETRIES):
         try:
-            response = requests.get(GOOGLE_GEOCODE_URL, params=params, timeout=10)
+            response = SESSION.get(GOOGLE_GEOCODE_URL, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
-            
-            if data['status'] == 'OK' and data['results']:
-                location = data['results'][0]['geometry']['location']
-                return {
-                    'lat': location['lat'],
-                    'lng': location['lng'],
-                    'formatted_address': data['results'][0].get('formatted_address', ''),
-                    'found': True
-                }
-            elif data['status'] == 'ZERO_RESULTS':
-                return None
-            elif data['status'] == 'OVER_QUERY_LIMIT':
-                print("  ⚠️ Rate limited, waiting...")
-                time.sleep(2)
-            else:
-                print(f"  Error: {data['status']}")
-                return None
-                
+            status = data.get('status')
         except Exception as e:
-            if attempt < retries - 1:
-                time.sleep(1)
-            else:
-                print(f"  Request error: {e}")
-                return None
+            print(f"  Request error: {e}")
+            return None
+        
+        if status == 'OK' and data.get('results'):
+            location = data['results'][0]['geometry']['location']
+            result = {
+                'lat': location['lat'],
+                'lng': location['lng'],
+                'formatted_address': data['results'][0].get('formatted_address', ''),
+                'found': True
+            }
+            if cache is not None:
+                cache.put(address, result)
+            return result
+        elif status == 'ZERO_RESULTS':
+            if cache is not None:
+                cache.put(address, None)
+            return None
+        elif status == 'OVER_QUERY_LIMIT':
+            print("  ⚠️ Rate limited, waiting...")
+            time.sleep(OVER_QUERY_LIMIT_BACKOFF * 2 ** attempt + random.uniform(0, OVER_QUERY_LIMIT_BACKOFF))
+        else:
+            print(f"  Error: {status}")
+            return None
     
     return None
 
 
-def geocode_all_stations(stations, api_key, output_path):
+def geocode_all_stations(stations, api_key, output_path, cache=None):
     """Geocode all polling stations."""
     geocoded = []
     success_count = 0
-    village_cache = {}
     
     print(f"\n🗺️  Geocoding {len(stations)} polling stations with Google Maps...")
     print("   (Results are cached per village to reduce API calls)\n")
     
+    # Stations are geocoded at village level, so only the distinct villages need requests;
+    # they are independent, so look them up concurrently over the shared session
+    villages = list(dict.fromkeys(station['village'] for station in stations))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        village_results = dict(zip(villages, ex.map(
+            lambda village: geocode_address(f"{village}, Uthiramerur, Kanchipuram, Tamil Nadu, India", api_key, cache),
+            villages
+        )))
+    
+    seen_villages = set()
     for i, station in enumerate(stations):
         station_no = station['station_no']
         building = station['building']
@@ -102,16 +149,10 @@ def geocode_all_stations(stations, api_key, output_path):
         
         print(f"[{i+1}/{len(stations)}] Station {station_no}: {village}...", end=" ")
         
-        # Try village-level first (more reliable, uses cache)
-        if village in village_cache:
-            result = village_cache[village]
+        result = village_results[village]
+        if result and village in seen_villages:
             print("(cached)", end=" ")
-        else:
-            # Geocode village + Uthiramerur
-            search_address = f"{village}, Uthiramerur, Kanchipuram, Tamil Nadu, India"
-            result = geocode_address(search_address, api_key)
-            if result:
-                village_cache[village] = result
+        seen_villages.add(village)
         
         if result:
             geocoded.append({
@@ -137,9 +178,6 @@ def geocode_all_stations(stations, api_key, output_path):
                 'found': False
             })
             print("✗ (fallback)")
-        
-        # Small delay to be nice to API
-        time.sleep(0.1)
     
     # Save results
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -177,8 +215,18 @@ def main():
     unique_villages = set(s['village'] for s in stations if s['village'])
     print(f"🏘️  Found {len(unique_villages)} unique villages to geocode")
     
+    # Answers from earlier runs are reused unless --no-cache is given
+    cache = None
+    if '--no-cache' not in sys.argv[1:]:
+        cache = GoogleGeocodeCache(base_dir / "data" / "google_geocode_cache.sqlite")
+    
     # Geocode all
-    geocoded = geocode_all_stations(stations, api_key, output_path)
+    try:
+        geocoded = geocode_all_stations(stations, api_key, output_path, cache)
+    finally:
+        # Commits whatever was looked up, even if the run is interrupted
+        if cache is not None:
+            cache.close()
     
     # Summary
     found = sum(1 for s in geocoded if s['found'])
@@ -0,0 +1,221 @@
+"""
+Helpers shared by the geocoding scripts: JSON output, request pacing, the on-disk
+geocode caches and the Nominatim lookup.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+# orjson is optional and much faster; the json fallback writes the same indented JSON,
+# except that orjson writes NaN/Infinity as null
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+HEADERS = {
+    'User-Agent': 'TN-Elections-Analysis/1.0 (educational project)'
+}
+
+# Nominatim's usage policy allows 1 request/second; keep a little headroom
+REQUEST_INTERVAL = 1.1
+
+# Nominatim responses worth retrying (as urllib3's Retry status_forcelist) and the base backoff in seconds
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+RETRY_BACKOFF = 0.5
+
+# Geocode caches commit after this many new entries
+CACHE_COMMIT_EVERY = 50
+# Google's answers for an address are stable, but not forever: re-check after 30 days
+GOOGLE_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+
+def dump_json(obj, path):
+    """Write obj as indented JSON, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+
+
+class AsyncRateLimiter:
+    """Lets one request start every `interval` seconds; waiters go in FIFO order."""
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+    
+    async def wait(self):
+        async with self._lock:
+            delay = self._next_start - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_start = time.monotonic() + self.interval
+
+
+class RateLimiter:
+    """Lets one request start every `interval` seconds across all threads."""
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+    
+    def wait(self):
+        with self._lock:
+            delay = self._next_start - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_start = time.monotonic() + self.interval
+
+
+class GeocodeCache:
+    """
+    On-disk geocoding results (SQLite), keyed by a hash of the search address.
+    Addresses with no result are cached too (miss=1); errors and quota failures are not.
+    Entries older than max_age seconds, when set, are treated as absent and looked up again.
+    Safe to share between lookup threads. Subclasses name the service's place-name field.
+    """
+    
+    name_field = None
+    max_age = None
+    
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL + NORMAL sync: small frequent writes without an fsync each
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv "
+            f"(k TEXT PRIMARY KEY, lat REAL, lng REAL, {self.name_field} TEXT, ts INTEGER, miss INTEGER)"
+        )
+        self.lock = threading.Lock()
+        self.pending = 0
+    
+    @staticmethod
+    def key(address):
+        # The exact search string: Google may answer differently for a differently punctuated one
+        return hashlib.blake2b(address.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def get(self, address):
+        """Returns (hit, result); result is None for a cached miss."""
+        oldest = int(time.time()) - self.max_age if self.max_age is not None else 0
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT lat, lng, {self.name_field}, miss FROM kv WHERE k = ? AND ts >= ?",
+                (self.key(address), oldest)
+            ).fetchone()
+        if row is None:
+            return False, None
+        lat, lng, name, miss = row
+        if miss:
+            return True, None
+        return True, {'lat': lat, 'lng': lng, self.name_field: name or '', 'found': True}
+    
+    def put(self, address, result):
+        if result:
+            values = (self.key(address), result['lat'], result['lng'], result.get(self.name_field), int(time.time()), 0)
+        else:
+            values = (self.key(address), None, None, None, int(time.time()), 1)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?, ?, ?)", values)
+            # Commit in batches rather than per lookup
+            self.pending += 1
+            if self.pending >= CACHE_COMMIT_EVERY:
+                self.conn.commit()
+                self.pending = 0
+    
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+class NominatimCache(GeocodeCache):
+    """Nominatim results; addresses differing only in case, punctuation or spacing share an entry."""
+    
+    name_field = 'display_name'
+    
+    @staticmethod
+    def key(address):
+        # Case, punctuation and spacing differences between stations shouldn't cost a request
+        normalised = " ".join(re.sub(r'[^\w\s]', ' ', address.lower()).split())
+        return hashlib.blake2b(normalised.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class GoogleGeocodeCache(GeocodeCache):
+    """Google results, keyed on the exact search string and re-checked after GOOGLE_CACHE_MAX_AGE."""
+    
+    name_field = 'formatted_address'
+    max_age = GOOGLE_CACHE_MAX_AGE
+
+
+async def geocode_address(session, limiter, cache, address, retries=2):
+    """Geocode a single address using Nominatim, via the on-disk cache."""
+    hit, cached = cache.get(address)
+    if hit:
+        return cached
+    
+    params = {
+        'q': address,
+        'format': 'json',
+        'limit': 1,
+        'countrycodes': 'in'
+    }
+    
+    for attempt in range(retries):
+        await limiter.wait()
+        try:
+            async with session.get(NOMINATIM_URL, params=params) as response:
+                if response.status in RETRY_STATUSES and attempt < retries - 1:
+                    # Throttled or upstream trouble: back off (or as long as the server asks) and retry
+                    retry_after = response.headers.get('Retry-After', '')
+                    delay = int(retry_after) if retry_after.isdigit() else RETRY_BACKOFF * 2 ** attempt
+                    results = None
+                elif response.status >= 400:
+                    # Any other HTTP error won't change on a retry
+                    print(f"  Error geocoding: HTTP {response.status} for {address}")
+                    return None
+                else:
+                    if ORJSON_AVAILABLE:
+                        results = orjson.loads(await response.read())
+                    else:
+                        results = await response.json()
+                    delay = None
+            
+            if delay is not None:
+                await asyncio.sleep(delay)
+                continue
+            
+            result = None
+            if results:
+                result = {
+                    'lat': float(results[0]['lat']),
+                    'lng': float(results[0]['lon']),
+                    'display_name': results[0].get('display_name', ''),
+                    'found': True
+                }
+            # Only real answers are cached; errors fall through to the retry below
+            cache.put(address, result)
+            return result
+        
+        except Exception as e:
+            # Connection problems and timeouts
+            if attempt < retries - 1:
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+            else:
+                print(f"  Error geocoding: {e}")
+                return None
+    
+    return None
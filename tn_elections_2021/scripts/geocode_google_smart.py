@@ -4,14 +4,22 @@ Smart geocoding using Google Maps API with building name caching.
 Groups similar buildings (same school, different sections) to share coordinates.
 """
 
+import atexit
 import json
 import re
 import os
+import random
+import sys
+import threading
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from collections import defaultdict
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from geocode_common import GoogleGeocodeCache, RateLimiter
 
 
 # Load environment variables
@@ -19,46 +27,89 @@ load_dotenv()
 GOOGLE_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
 GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 
+# One keep-alive session for every request, so the TLS connection to Google is reused
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+atexit.register(SESSION.close)
+
+# Throttling (HTTP 429, or OVER_QUERY_LIMIT in a 200) and transient server errors are retried
+# in geocode_google, so every attempt is paced and counted against MAX_API_CALLS. Waits are
+# base * 2**attempt plus jitter (or the server's Retry-After), so threads don't retry in lockstep.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ATTEMPTS = 5
+RETRY_BACKOFF = 0.1
+
 # Stats tracking
 api_calls_made = 0
+api_calls_lock = threading.Lock()
 MAX_API_CALLS = 1000
 
+# Persistent geocode cache, opened in main(); None means every lookup hits the API
+geocode_cache = None
+
+# Concurrent lookups, and the request rate they share (Google allows 50 QPS)
+MAX_WORKERS = 20
+MAX_QPS = 40
+rate_limiter = RateLimiter(1 / MAX_QPS)
+
+
+# Directional and structural suffixes that don't change which building a station is in,
+# each with the words it needs: a pattern is only run when one of them is in the name
+REMOVE_PATTERNS = [(keywords, re.compile(pattern, re.IGNORECASE)) for keywords, pattern in [
+    (('EAST', 'WEST', 'NORTH', 'SOUTH'), r',?\s*(EAST|WEST|NORTH|SOUTH)\s*(FACING|BUILDING|SIDE|WING|PORTION)?\s*'),
+    (('NEW', 'OLD'), r',?\s*(NEW|OLD)\s*(BUILDING|BLOCK)?\s*'),
+    (('ROOM',), r',?\s*ROOM\s*NO\.?\s*\d+\s*'),
+    (('HALL',), r',?\s*HALL\s*NO\.?\s*\d+\s*'),
+    (('BLOCK',), r',?\s*BLOCK\s*[A-Z0-9]+\s*'),
+    (('LEFT', 'RIGHT', 'MIDDLE', 'CENTRE', 'CENTER'), r',?\s*(LEFT|RIGHT|MIDDLE|CENTRE|CENTER)\s*(PORTION|SIDE|WING)?\s*'),
+    (('DOWN',), r',?\s*DOWN\s*STAIR[S]?\s*'),
+    (('UP',), r',?\s*UP\s*STAIR[S]?\s*'),
+    (('GROUND',), r',?\s*GROUND\s*FLOOR\s*'),
+    (('FIRST',), r',?\s*FIRST\s*FLOOR\s*'),
+    (('JVVD',), r'\s+JVVD\s+'),
+]]
+WHITESPACE_RE = re.compile(r'\s+')
+TRAILING_COMMA_RE = re.compile(r',\s*$')
+
 
 def normalize_building(building):
     """Normalize building name to core identity for caching."""
     text = building.upper()
     
     # Remove directional and structural suffixes
-    remove_patterns = [
-        r',?\s*(EAST|WEST|NORTH|SOUTH)\s*(FACING|BUILDING|SIDE|WING|PORTION)?\s*',
-        r',?\s*(NEW|OLD)\s*(BUILDING|BLOCK)?\s*',
-        r',?\s*ROOM\s*NO\.?\s*\d+\s*',
-        r',?\s*HALL\s*NO\.?\s*\d+\s*',
-        r',?\s*BLOCK\s*[A-Z0-9]+\s*',
-        r',?\s*(LEFT|RIGHT|MIDDLE|CENTRE|CENTER)\s*(PORTION|SIDE|WING)?\s*',
-        r',?\s*DOWN\s*STAIR[S]?\s*',
-        r',?\s*UP\s*STAIR[S]?\s*',
-        r',?\s*GROUND\s*FLOOR\s*',
-        r',?\s*FIRST\s*FLOOR\s*',
-        r'\s+JVVD\s+',
-    ]
-    for pattern in remove_patterns:
-        text = re.sub(pattern, ' ', text, flags=re.IGNORECASE)
+    for keywords, pattern in REMOVE_PATTERNS:
+        if any(keyword in text for keyword in keywords):
+            text = pattern.sub(' ', text)
     
     # Clean up
-    text = re.sub(r'\s+', ' ', text).strip()
-    text = re.sub(r',\s*$', '', text)
+    text = WHITESPACE_RE.sub(' ', text).strip()
+    text = TRAILING_COMMA_RE.sub('', text)
     
     return text
 
 
-def geocode_google(address, retries=2):
-    """Geocode using Google Maps API."""
+def retry_delay(attempt):
+    """Jittered exponential backoff before retry number attempt + 1."""
+    return RETRY_BACKOFF * 2 ** attempt + random.uniform(0, RETRY_BACKOFF)
+
+
+def reserve_api_call():
+    """Count one API call against MAX_API_CALLS; False once the budget is used up."""
     global api_calls_made
     
-    if api_calls_made >= MAX_API_CALLS:
-        print(f"\n⚠️  Max API calls ({MAX_API_CALLS}) reached!")
-        return None
+    with api_calls_lock:
+        if api_calls_made >= MAX_API_CALLS:
+            return False
+        api_calls_made += 1
+        return True
+
+
+def geocode_google(address):
+    """Geocode using Google Maps API, via the on-disk cache when it is open."""
+    if geocode_cache is not None:
+        hit, cached = geocode_cache.get(address)
+        if hit:
+            return cached
     
     params = {
         'address': address,
@@ -66,83 +117,129 @@ def geocode_google(address, retries=2):
         'region': 'in'  # Bias towards India
     }
     
-    for attempt in range(retries):
+    status = None
+    for attempt in range(RETRY_ATTEMPTS):
+        if not reserve_api_call():
+            print(f"\n⚠️  Max API calls ({MAX_API_CALLS}) reached!")
+            return None
+        
         try:
-            response = requests.get(GOOGLE_GEOCODE_URL, params=params, timeout=10)
-            api_calls_made += 1
+            rate_limiter.wait()
+            response = SESSION.get(GOOGLE_GEOCODE_URL, params=params, timeout=10)
             
-            data = response.json()
+            if response.status_code in RETRY_STATUSES:
+                status = response.status_code
+                retry_after = response.headers.get('Retry-After', '')
+                time.sleep(int(retry_after) if retry_after.isdigit() else retry_delay(attempt))
+                continue
             
-            if data['status'] == 'OK' and data['results']:
-                location = data['results'][0]['geometry']['location']
-                return {
-                    'lat': location['lat'],
-                    'lng': location['lng'],
-                    'formatted_address': data['results'][0].get('formatted_address', ''),
-                    'found': True
-                }
-            elif data['status'] == 'ZERO_RESULTS':
-                return None
-            elif data['status'] == 'OVER_QUERY_LIMIT':
-                print(f"\n⚠️  API quota exceeded!")
-                return None
-            else:
-                if attempt < retries - 1:
-                    time.sleep(0.5)
-                    
-        except Exception as e:
-            if attempt < retries - 1:
-                time.sleep(0.5)
+            data = response.json()
+            status = data.get('status')
+        except Exception:
+            return None
+        
+        if status == 'OK' and data.get('results'):
+            location = data['results'][0]['geometry']['location']
+            result = {
+                'lat': location['lat'],
+                'lng': location['lng'],
+                'formatted_address': data['results'][0].get('formatted_address', ''),
+                'found': True
+            }
+            if geocode_cache is not None:
+                geocode_cache.put(address, result)
+            return result
+        elif status == 'ZERO_RESULTS':
+            if geocode_cache is not None:
+                geocode_cache.put(address, None)
+            return None
+        elif status == 'OVER_QUERY_LIMIT':
+            time.sleep(retry_delay(attempt))
+        else:
+            return None
     
+    if status == 'OVER_QUERY_LIMIT':
+        print(f"\n⚠️  API quota exceeded!")
     return None
 
 
+def geocode_building(building, village, const_name):
+    """Geocode one building, falling back to its village + constituency."""
+    # Build search address
+    search_parts = [building]
+    if village:
+        search_parts.append(village)
+    search_parts.extend([const_name, "Kanchipuram", "Tamil Nadu", "India"])
+    search_address = ", ".join(filter(None, search_parts))
+    
+    result = geocode_google(search_address)
+    
+    # If failed, try with just village + constituency
+    if not result and village:
+        fallback_address = f"{village}, {const_name}, Kanchipuram, Tamil Nadu, India"
+        result = geocode_google(fallback_address)
+    
+    return result
+
+
+def geocoded_meta_path(output_path):
+    """Marker file next to a geocoded output: foo_booths_geocoded.json -> foo_booths_geocoded.meta.json"""
+    return Path(output_path).with_suffix('.meta.json')
+
+
+def geocoded_found_count(output_path):
+    """Number of stations in output_path that Google found (not fallback)."""
+    meta_path = geocoded_meta_path(output_path)
+    try:
+        # The marker only counts if it was written after the output (another script may have rewritten it)
+        if meta_path.stat().st_mtime >= output_path.stat().st_mtime:
+            with open(meta_path) as f:
+                return json.load(f)['found_count']
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    with open(output_path) as f:
+        existing = json.load(f)
+    return sum(1 for s in existing if s.get('found', False))
+
+
 def geocode_constituency(const_name, stations, output_path, fallback_center):
     """Geocode all stations for a constituency using caching."""
-    global api_calls_made
-    
     geocoded = []
-    cache = {}  # Cache by normalized building name
     cached_hits = 0
     successful = 0
     
     print(f"\n🗺️  Geocoding {len(stations)} stations for {const_name}...")
     print(f"   API calls used so far: {api_calls_made}/{MAX_API_CALLS}\n")
     
+    # One lookup per normalized building name, using the first station that has it
+    rows = []
+    unique = {}
     for i, station in enumerate(stations):
         building = station.get('building', '')
         station_no = station.get('station_no', station.get('sl_no', i+1))
         village = station.get('village', '')
-        
         normalized = normalize_building(building)
-        
+        rows.append((station_no, building, village, normalized))
+        unique.setdefault(normalized, (building, village))
+    
+    # The lookups are independent and network-bound, so run them concurrently;
+    # rate_limiter keeps the request rate under Google's QPS limit
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        cache = dict(zip(unique, ex.map(
+            lambda key: geocode_building(*unique[key], const_name),
+            unique
+        )))
+    
+    seen = set()
+    for i, (station_no, building, village, normalized) in enumerate(rows):
         print(f"[{i+1}/{len(stations)}] Station {station_no}: {building[:40]}...", end=" ", flush=True)
         
-        # Check cache first
-        if normalized in cache:
-            result = cache[normalized]
+        result = cache[normalized]
+        if normalized in seen:
             cached_hits += 1
             print(f"(cached)", end=" ")
-        else:
-            # Build search address
-            search_parts = [building]
-            if village:
-                search_parts.append(village)
-            search_parts.extend([const_name, "Kanchipuram", "Tamil Nadu", "India"])
-            search_address = ", ".join(filter(None, search_parts))
-            
-            result = geocode_google(search_address)
-            
-            # If failed, try with just village + constituency
-            if not result and village:
-                fallback_address = f"{village}, {const_name}, Kanchipuram, Tamil Nadu, India"
-                result = geocode_google(fallback_address)
-            
-            # Cache the result (even if None)
-            cache[normalized] = result
-            
-            # Small delay to be nice to the API
-            time.sleep(0.1)
+        seen.add(normalized)
         
         if result:
             geocoded.append({
@@ -165,16 +262,15 @@ def geocode_constituency(const_name, stations, output_path, fallback_center):
                 'found': False
             })
             print("✗ (fallback)")
-        
-        # Check API limit
-        if api_calls_made >= MAX_API_CALLS:
-            print(f"\n⚠️  Stopping - API limit reached")
-            break
     
     # Save results
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(geocoded, f, indent=2, ensure_ascii=False)
     
+    # Small marker with the counts, so later runs can skip without re-reading the results
+    with open(geocoded_meta_path(output_path), 'w') as f:
+        json.dump({'found_count': successful, 'total': len(stations)}, f)
+    
     print(f"\n✅ {const_name}: {successful}/{len(stations)} geocoded")
     print(f"   Cache hits: {cached_hits} | API calls: {api_calls_made}")
     print(f"📁 Saved: {output_path}")
@@ -183,7 +279,7 @@ def geocode_constituency(const_name, stations, output_path, fallback_center):
 
 
 def main():
-    global api_calls_made
+    global api_calls_made, geocode_cache
     
     if not GOOGLE_API_KEY:
         print("❌ GOOGLE_MAPS_API_KEY not found in .env file")
@@ -195,6 +291,10 @@ def main():
     base_dir = Path(__file__).parent.parent
     data_dir = base_dir / "data"
     
+    # Answers from earlier runs are reused unless --no-cache is given
+    if '--no-cache' not in sys.argv[1:]:
+        geocode_cache = GoogleGeocodeCache(data_dir / "google_geocode_cache.sqlite")
+    
     # Constituency configs: (name, ac_number, fallback_center)
     constituencies = [
         ("alandur", "028", (13.0024, 80.2065)),
@@ -203,32 +303,35 @@ def main():
         ("uthiramerur", "036", (12.6149, 79.7594)),
     ]
     
-    for const_name, ac_number, center in constituencies:
-        input_path = data_dir / f"{const_name}_polling_stations.json"
-        output_path = data_dir / f"{const_name}_booths_geocoded.json"
-        
-        if not input_path.exists():
-            print(f"⏭️  Skipping {const_name} - input file not found")
-            continue
-        
-        # Skip if already geocoded
-        if output_path.exists():
-            with open(output_path) as f:
-                existing = json.load(f)
-            # Check if using Google (not fallback)
-            found_count = sum(1 for s in existing if s.get('found', False))
-            if found_count > 0:
-                print(f"⏭️  Skipping {const_name} - already geocoded ({found_count} found)")
+    try:
+        for const_name, ac_number, center in constituencies:
+            input_path = data_dir / f"{const_name}_polling_stations.json"
+            output_path = data_dir / f"{const_name}_booths_geocoded.json"
+            
+            if not input_path.exists():
+                print(f"⏭️  Skipping {const_name} - input file not found")
                 continue
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            stations = json.load(f)
-        
-        geocode_constituency(const_name, stations, output_path, center)
-        
-        if api_calls_made >= MAX_API_CALLS:
-            print(f"\n🛑 Stopping - API limit reached ({api_calls_made}/{MAX_API_CALLS})")
-            break
+            
+            # Skip if already geocoded
+            if output_path.exists():
+                # Check if using Google (not fallback)
+                found_count = geocoded_found_count(output_path)
+                if found_count > 0:
+                    print(f"⏭️  Skipping {const_name} - already geocoded ({found_count} found)")
+                    continue
+            
+            with open(input_path, 'r', encoding='utf-8') as f:
+                stations = json.load(f)
+            
+            geocode_constituency(const_name, stations, output_path, center)
+            
+            if api_calls_made >= MAX_API_CALLS:
+                print(f"\n🛑 Stopping - API limit reached ({api_calls_made}/{MAX_API_CALLS})")
+                break
+    finally:
+        # Commits whatever was looked up, even if the run is interrupted
+        if geocode_cache is not None:
+            geocode_cache.close()
     
     print(f"\n✨ Done! Total API calls: {api_calls_made}/{MAX_API_CALLS}")
 
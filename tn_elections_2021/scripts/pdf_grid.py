@@ -0,0 +1,77 @@
+"""
+Ruled-table reader on pdfminer's layout objects, shared by the PDF extraction scripts.
+"""
+
+from bisect import bisect_right
+
+from pdfminer.layout import LTChar, LTLine, LTRect
+from pdfplumber.utils import extract_text
+
+
+# Rects/lines thinner than this (pt) are table rulings; rulings closer than this are one edge
+RULE_TOLERANCE = 3
+
+
+def merge_positions(values):
+    """Collapse ruling positions within RULE_TOLERANCE of each other into their mean."""
+    merged = []
+    cluster = []
+    for v in sorted(values):
+        if cluster and v - cluster[-1] > RULE_TOLERANCE:
+            merged.append(sum(cluster) / len(cluster))
+            cluster = []
+        cluster.append(v)
+    if cluster:
+        merged.append(sum(cluster) / len(cluster))
+    return merged
+
+
+def grid_table(layout):
+    """
+    Read a fully ruled table straight from pdfminer's layout objects.
+    
+    Column/row boundaries are the ruling rects; each char goes to the cell containing its
+    centre and cell text is built with pdfplumber's own extract_text, so rows come out the
+    same as page.extract_tables() without pdfplumber's per-object processing. Merged cells
+    come out split, so only use it on tables whose cells are all ruled.
+    Returns None when the page has no usable grid.
+    """
+    height = layout.y1
+    xs, tops, chars = [], [], []
+    
+    for obj in layout:
+        if isinstance(obj, LTChar):
+            chars.append({
+                'text': obj.get_text(),
+                'x0': obj.x0, 'x1': obj.x1,
+                'top': height - obj.y1, 'bottom': height - obj.y0,
+                'doctop': height - obj.y1,
+                'upright': obj.upright,
+                'matrix': obj.matrix,
+            })
+        elif isinstance(obj, (LTRect, LTLine)):
+            if obj.width <= RULE_TOLERANCE:
+                xs.append((obj.x0 + obj.x1) / 2)
+            if obj.height <= RULE_TOLERANCE:
+                tops.append(height - (obj.y0 + obj.y1) / 2)
+    
+    xs = merge_positions(xs)
+    tops = merge_positions(tops)
+    if len(xs) < 4 or len(tops) < 2:
+        return None
+    
+    # Bucket chars into cells by their centre point
+    cells = {}
+    for char in chars:
+        h_mid = (char['x0'] + char['x1']) / 2
+        v_mid = (char['top'] + char['bottom']) / 2
+        col = bisect_right(xs, h_mid) - 1
+        row = bisect_right(tops, v_mid) - 1
+        if 0 <= col < len(xs) - 1 and 0 <= row < len(tops) - 1:
+            cells.setdefault((row, col), []).append(char)
+    
+    return [
+        [extract_text(cells[(row, col)]) if (row, col) in cells else ""
+         for col in range(len(xs) - 1)]
+        for row in range(len(tops) - 1)
+    ]
@@ -4,11 +4,32 @@ Process all constituency CSV files to generate standardized JSON files.
 Fixes the "Others" column by summing all non-DMK/AIADMK candidate votes.
 """
 
+import io
+import numpy as np
 import pandas as pd
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import lru_cache
 from pathlib import Path
 import re
 
+# orjson is optional and much faster; the json fallback writes the same indented JSON,
+# except that orjson writes NaN/Infinity as null
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# pyarrow is optional; its multithreaded C++ CSV reader replaces pandas' parser when installed
+try:
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 # Paths
 EXTRACTED_DIR = Path(__file__).parent.parent / 'extracted'
 FRONTEND_DATA_DIR = Path(__file__).parent.parent / 'frontend' / 'data'
@@ -17,18 +38,53 @@ CONSTITUENCIES_FILE = Path(__file__).parent.parent / 'data' / 'constituencies.js
 # Ensure output directory exists
 FRONTEND_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+def load_json(path):
+    """Read a JSON file, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def dump_json(obj, path):
+    """
+    Write obj as indented JSON, using orjson when it is installed.
+    A file that already holds exactly this JSON is left untouched (keeping its mtime);
+    otherwise it is replaced atomically, so readers never see a half-written file.
+    Returns True if the file was written.
+    """
+    if ORJSON_AVAILABLE:
+        payload = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    
+    path = Path(path)
+    try:
+        if path.stat().st_size == len(payload) and path.read_bytes() == payload:
+            return False
+    except FileNotFoundError:
+        pass
+    
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return True
+
 def identify_party_columns(df):
     """Identify which candidate columns correspond to DMK and AIADMK."""
+    return _identify_party_columns(tuple(df.columns))
+
+@lru_cache(maxsize=None)
+def _identify_party_columns(columns):
+    """identify_party_columns on the column names alone, so repeated headers are matched once."""
     dmk_col = None
     aiadmk_col = None
     
     # Column names are reversed! Check by reversing them
-    candidate_cols = [col for col in df.columns if col.startswith('candidate_')]
+    cols_info = [(col, col.upper(), col.upper()[::-1]) for col in columns if col.startswith('candidate_')]
     
-    for col in candidate_cols:
-        col_upper = col.upper()
-        col_reversed = col_upper[::-1]
-        
+    for col, col_upper, col_reversed in cols_info:
         # DMK patterns (reversed): ends with "AD" and contains "MUNNETRA" or "DMK"
         # Uthiramerur: "candidate_1_ARTENNUM MAGAHZAK AD" -> reversed has "DA KAZHAGAM MUNNETRA"
         # Alandur: "candidate_1_magahzaK artennuM ad" -> reversed has "da Munnetra Kazhagam"
@@ -43,13 +99,45 @@ def identify_party_columns(df):
         if col_upper.endswith('AI') or 'ANNA' in col_upper:
             if 'MUNNETRA' in col_reversed or 'ANNA' in col_reversed:
                 aiadmk_col = col
+        
+        # Each party has one candidate, so stop at the second match
+        if dmk_col and aiadmk_col:
+            break
     
     return dmk_col, aiadmk_col
 
+@lru_cache(maxsize=None)
+def party_abbreviation(col):
+    """
+    Short party name for an 'other' candidate column, or None for a column without a party
+    name. Column names hold the party reversed, e.g. "candidate_5_ralimaT maaN ihctaK".
+    """
+    party_name = col.replace('candidate_', '').split('_', 1)
+    if len(party_name) < 2:
+        return None
+    
+    # Reverse the party name back
+    party_abbr = party_name[1].upper()[::-1].strip()
+    # Simplify common party names
+    if 'BAHUJAN' in party_abbr or 'BSP' in party_abbr:
+        return 'BSP'
+    elif 'MAKKAL NEEDHI' in party_abbr or 'MAIAM' in party_abbr:
+        return 'MDMK'
+    elif 'TAMILAR' in party_abbr and 'NAAM' in party_abbr:
+        return 'NTK'
+    elif 'PATTALI' in party_abbr or 'PMK' in party_abbr:
+        return 'PMK'
+    elif party_abbr == '':
+        return 'IND'
+    return party_abbr
+
 def process_constituency_csv(csv_path, ac_number, ac_name):
     """Process a single constituency CSV file."""
     try:
-        df = pd.read_csv(csv_path)
+        if PYARROW_AVAILABLE:
+            df = pa_csv.read_csv(csv_path).to_pandas()
+        else:
+            df = pd.read_csv(csv_path)
         
         # Check if file is empty or just header
         if len(df) == 0:
@@ -68,91 +156,82 @@ def process_constituency_csv(csv_path, ac_number, ac_name):
         # Get all candidate columns (columns starting with 'candidate_')
         candidate_cols = [col for col in df.columns if col.startswith('candidate_') and col not in [dmk_col, aiadmk_col]]
         
+        # Work column-wise on whole arrays; only the per-booth dicts are built row by row
+        n = len(df)
+        # table_no is sequential within PDF pages (1-28 per page), NOT unique,
+        # so booth_no is the 1-indexed row number
+        booth_nos = [str(idx + 1) for idx in df.index]
+        
+        # Extract numeric station number from polling_station_no (e.g. "5 (M)") for lookups
+        station_col = 'polling_station_no' if 'polling_station_no' in df.columns else 'table_no'
+        if station_col in df.columns:
+            station_digits = df[station_col].astype(str).str.strip().str.extract(r'(\d+)', expand=False)
+            station_nos = [
+                int(digits) if isinstance(digits, str) else idx + 1
+                for idx, digits in zip(df.index, station_digits)
+            ]
+        else:
+            station_nos = [idx + 1 for idx in df.index]
+        
+        dmk = df[dmk_col].fillna(0).astype('int64').to_numpy()
+        aiadmk = df[aiadmk_col].fillna(0).astype('int64').to_numpy()
+        main_total = dmk + aiadmk
+        
+        # Other candidates: only columns carrying a party name count, and a value at or above
+        # DMK + AIADMK is skipped (likely a cumulative total column)
+        party_groups = {}  # abbreviation -> its columns, in first-seen order
+        for col in candidate_cols:
+            party_abbr = party_abbreviation(col)
+            if party_abbr is not None:
+                party_groups.setdefault(party_abbr, []).append(col)
+        party_abbrs = list(party_groups)
+        
+        # Sum each party's columns (e.g. all the independents) into one column per party
+        party_votes = np.zeros((n, len(party_abbrs)), dtype='int64')
+        counted = np.zeros((n, len(party_abbrs)), dtype=bool)
+        for p, cols in enumerate(party_groups.values()):
+            group = df[cols]
+            values = group.fillna(0).astype('int64').to_numpy()
+            group_counted = group.notna().to_numpy() & (values < main_total[:, None])
+            party_votes[:, p] = np.where(group_counted, values, 0).sum(axis=1)
+            counted[:, p] = group_counted.any(axis=1)
+        others = party_votes.sum(axis=1)
+        
+        total = main_total + others
+        dmk_wins = dmk > aiadmk
+        margin = np.abs(dmk - aiadmk)
+        margin_pct = np.divide(margin, total, out=np.zeros(n), where=total > 0) * 100
+        category = np.select([margin_pct > 10, margin_pct > 5], ['STRONG', 'LEAN'], 'SWING')
+        # Rounded after categorizing, so 10.004% still counts as STRONG
+        margin_pct = np.round(margin_pct, 2)
+        
         booths = []
-        for idx, row in df.iterrows():
-            # Use row index + 1 as unique identifier since table_no resets per page
-            # booth_no = polling_station_no (the actual booth identifier like "5 (M)")
-            polling_station = str(row.get('polling_station_no', row.get('table_no', ''))).strip()
-            
-            # table_no is sequential within PDF pages (1-28 per page), NOT unique
-            # Use row index as a unique sequential number
-            booth_no = str(idx + 1)  # 1-indexed unique ID
-            
-            # Extract numeric station number from polling_station_no for lookups
-            try:
-                match = re.search(r'\d+', polling_station)
-                station_no = int(match.group()) if match else idx + 1
-            except:
-                station_no = idx + 1
-            
-            dmk_votes = int(row[dmk_col]) if pd.notna(row[dmk_col]) else 0
-            aiadmk_votes = int(row[aiadmk_col]) if pd.notna(row[aiadmk_col]) else 0
-            
-            # Extract individual party votes from other candidate columns
-            other_parties = {}
-            others_total = 0
-            
-            for col in candidate_cols:
-                if pd.notna(row[col]):
-                    val = int(row[col])
-                    # Skip if value is greater than DMK + AIADMK (likely cumulative total)
-                    if val < dmk_votes + aiadmk_votes:
-                        # Extract party name from column (reversed)
-                        party_name = col.replace('candidate_', '').split('_', 1)
-                        if len(party_name) > 1:
-                            # Reverse the party name back
-                            party_abbr = party_name[1].upper()[::-1].strip()
-                            # Simplify common party names
-                            if 'BAHUJAN' in party_abbr or 'BSP' in party_abbr:
-                                party_abbr = 'BSP'
-                            elif 'MAKKAL NEEDHI' in party_abbr or 'MAIAM' in party_abbr:
-                                party_abbr = 'MDMK'
-                            elif 'TAMILAR' in party_abbr and 'NAAM' in party_abbr:
-                                party_abbr = 'NTK'
-                            elif 'PATTALI' in party_abbr or 'PMK' in party_abbr:
-                                party_abbr = 'PMK'
-                            elif party_abbr == '':
-                                party_abbr = 'IND'
-                            
-                            # Aggregate if party already exists
-                            if party_abbr in other_parties:
-                                other_parties[party_abbr] += val
-                            else:
-                                other_parties[party_abbr] = val
-                            others_total += val
-            
-            total_votes = dmk_votes + aiadmk_votes + others_total
-            
-            # Determine winner
-            if dmk_votes > aiadmk_votes:
-                winner = "DMK"
-                margin = dmk_votes - aiadmk_votes
-            else:
-                winner = "AIADMK"
-                margin = aiadmk_votes - dmk_votes
-            
-            margin_pct = (margin / total_votes * 100) if total_votes > 0 else 0
-            
-            # Category based on margin
-            if margin_pct > 10:
-                category = "STRONG"
-            elif margin_pct > 5:
-                category = "LEAN"
-            else:
-                category = "SWING"
+        rows = zip(
+            booth_nos, station_nos, dmk.tolist(), aiadmk.tolist(), others.tolist(), total.tolist(),
+            dmk_wins.tolist(), margin.tolist(), margin_pct.tolist(), category.tolist(),
+            counted.tolist(), party_votes.tolist()
+        )
+        for (booth_no, station_no, dmk_votes, aiadmk_votes, others_total, total_votes,
+             dmk_won, booth_margin, pct, booth_category, row_counted, row_votes) in rows:
+            # Individual party votes
+            other_parties = {
+                party_abbr: val
+                for party_abbr, is_counted, val in zip(party_abbrs, row_counted, row_votes)
+                if is_counted
+            }
             
             booth = {
                 "booth_no": booth_no,
-                "station_no": int(station_no) if pd.notna(station_no) else 0,
-                "winner": winner,
+                "station_no": station_no,
+                "winner": "DMK" if dmk_won else "AIADMK",
                 "dmk_votes": dmk_votes,
                 "aiadmk_votes": aiadmk_votes,
                 "other_parties": other_parties,
                 "others_votes": others_total,  # Keep for backward compatibility
                 "total_votes": total_votes,
-                "margin": margin,
-                "margin_pct": round(margin_pct, 2),
-                "category": category,
+                "margin": booth_margin,
+                "margin_pct": pct if total_votes > 0 else 0,
+                "category": booth_category,
                 "village": "",
                 "building": "",
                 "lat": None,
@@ -161,12 +240,12 @@ def process_constituency_csv(csv_path, ac_number, ac_name):
             
             booths.append(booth)
         
-        # Calculate summary
-        dmk_won = sum(1 for b in booths if b['winner'] == 'DMK')
-        aiadmk_won = sum(1 for b in booths if b['winner'] == 'AIADMK')
-        swing = sum(1 for b in booths if b['category'] == 'SWING')
-        lean = sum(1 for b in booths if b['category'] == 'LEAN')
-        strong = sum(1 for b in booths if b['category'] == 'STRONG')
+        # Calculate summary from the arrays rather than re-scanning booths
+        dmk_won = int(np.count_nonzero(dmk_wins))
+        aiadmk_won = n - dmk_won
+        swing = int(np.count_nonzero(category == 'SWING'))
+        lean = int(np.count_nonzero(category == 'LEAN'))
+        strong = n - swing - lean
         
         result = {
             "constituency": f"{ac_name} (AC{ac_number})",
@@ -188,8 +267,14 @@ def process_constituency_csv(csv_path, ac_number, ac_name):
         print(f"  ❌ Error processing {ac_name}: {e}")
         return None
 
-def merge_with_geocoded_data(processed_data, ac_number, ac_name):
-    """Merge with existing geocoded data if available."""
+def merge_with_geocoded_data(processed_data, ac_number, ac_name, available=None):
+    """
+    Merge with existing geocoded data if available.
+    available is the set of file names in FRONTEND_DATA_DIR; main() lists it once for every call.
+    """
+    if available is None:
+        available = {entry.name for entry in os.scandir(FRONTEND_DATA_DIR)}
+    
     # Try multiple filename patterns
     name_clean = ac_name.lower().replace(' ', '_')
     possible_files = [
@@ -200,7 +285,7 @@ def merge_with_geocoded_data(processed_data, ac_number, ac_name):
     
     geocoded_file = None
     for fp in possible_files:
-        if fp.exists():
+        if fp.name in available:
             geocoded_file = fp
             break
     
@@ -210,17 +295,15 @@ def merge_with_geocoded_data(processed_data, ac_number, ac_name):
     print(f"  📍 Merging geocoded data for AC{ac_number}")
     
     try:
-        with open(geocoded_file, 'r') as f:
-            geocoded = json.load(f)
+        geocoded = load_json(geocoded_file)
         
-        # Create lookup by booth_no
+        # Create lookup by booth_no (processed booth_no values are already strings)
         geocoded_lookup = {str(b['booth_no']): b for b in geocoded.get('booths', [])}
         
         # Merge lat/lng and location data
         for booth in processed_data['booths']:
-            booth_no = str(booth['booth_no'])
-            if booth_no in geocoded_lookup:
-                geo_booth = geocoded_lookup[booth_no]
+            geo_booth = geocoded_lookup.get(booth['booth_no'])
+            if geo_booth is not None:
                 booth['lat'] = geo_booth.get('lat')
                 booth['lng'] = geo_booth.get('lng')
                 booth['village'] = geo_booth.get('village', '')
@@ -232,11 +315,46 @@ def merge_with_geocoded_data(processed_data, ac_number, ac_name):
         print(f"  ⚠️  Error merging geocoded data: {e}")
         return processed_data
 
+def process_one(args):
+    """
+    Worker for the process pool: process one constituency CSV and save its JSON.
+    Returns (ac_number, info, log), with the worker's prints in log; info holds what
+    master.json needs (total_booths, has_geocoding), or is None if the CSV was skipped.
+    """
+    csv_name, ac_number, ac_name, available = args
+    
+    log = io.StringIO()
+    with redirect_stdout(log):
+        print(f"Processing AC{ac_number} - {ac_name}...")
+        
+        # Process CSV
+        data = process_constituency_csv(EXTRACTED_DIR / csv_name, ac_number, ac_name)
+        if not data:
+            return ac_number, None, log.getvalue()
+        
+        # Merge with geocoded data if available
+        data = merge_with_geocoded_data(data, ac_number, ac_name, available)
+        
+        # Save individual constituency file
+        output_file = FRONTEND_DATA_DIR / f"{ac_name.lower().replace(' ', '_')}.json"
+        dump_json(data, output_file)
+        
+        print(f"  ✅ Saved: {output_file.name} ({data['summary']['total_booths']} booths)\n")
+    
+    # Only this summary goes back to main(), not the booth list
+    info = {
+        "total_booths": data['summary']['total_booths'],
+        "has_geocoding": any(b.get('lat') for b in data['booths'])
+    }
+    return ac_number, info, log.getvalue()
+
 def generate_master_json(constituencies_data):
-    """Generate master.json with hierarchy."""
+    """
+    Generate master.json with hierarchy.
+    constituencies_data maps ac_number to the info dict returned by process_one.
+    """
     # Load constituency metadata
-    with open(CONSTITUENCIES_FILE, 'r') as f:
-        meta = json.load(f)
+    meta = load_json(CONSTITUENCIES_FILE)
     
     # Group by district
     districts = {}
@@ -257,8 +375,8 @@ def generate_master_json(constituencies_data):
             "name": const['name'],
             "type": const['type'],
             "data_file": f"{const['name'].lower()}.json",
-            "has_geocoding": const_data and any(b.get('lat') for b in const_data['booths']) if const_data else False,
-            "total_booths": const_data['summary']['total_booths'] if const_data else 0
+            "has_geocoding": const_data['has_geocoding'] if const_data else False,
+            "total_booths": const_data['total_booths'] if const_data else 0
         })
     
     master = {
@@ -274,43 +392,40 @@ def main():
     
     constituencies_data = {}
     
-    # Process each CSV file
-    csv_files = sorted(EXTRACTED_DIR.glob("AC*_booths.csv"))
+    # One listing of each directory, instead of a glob and a stat per file
+    csv_names = sorted(
+        entry.name for entry in os.scandir(EXTRACTED_DIR)
+        if entry.name.startswith('AC') and entry.name.endswith('_booths.csv')
+    )
+    available = frozenset(entry.name for entry in os.scandir(FRONTEND_DATA_DIR))
     
-    for csv_path in csv_files:
+    work = []
+    for csv_name in csv_names:
         # Extract AC number and name from filename
-        match = re.match(r'AC(\d+)_(.+)_booths\.csv', csv_path.name)
+        match = re.match(r'AC(\d+)_(.+)_booths\.csv', csv_name)
         if not match:
             continue
         
         ac_number = match.group(1)
         ac_name = match.group(2).replace('_', ' ').title()
-        
-        print(f"Processing AC{ac_number} - {ac_name}...")
-        
-        # Process CSV
-        data = process_constituency_csv(csv_path, ac_number, ac_name)
-        
-        if data:
-            # Merge with geocoded data if available
-            data = merge_with_geocoded_data(data, ac_number, ac_name)
-            
-            constituencies_data[ac_number] = data
-            
-            # Save individual constituency file
-            output_file = FRONTEND_DATA_DIR / f"{ac_name.lower().replace(' ', '_')}.json"
-            with open(output_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            
-            print(f"  ✅ Saved: {output_file.name} ({data['summary']['total_booths']} booths)\n")
+        work.append((csv_name, ac_number, ac_name, available))
+    
+    # Constituencies are independent and CPU-bound, so process them in parallel;
+    # each worker's output is captured and printed here in the original order
+    with ProcessPoolExecutor(max_workers=max(1, min(len(work), os.cpu_count() or 1))) as ex:
+        results = list(ex.map(process_one, work))
+    
+    for ac_number, info, log in results:
+        print(log, end='')
+        if info:
+            constituencies_data[ac_number] = info
     
     # Generate master.json
     print("\n📋 Generating master.json...")
     master = generate_master_json(constituencies_data)
     
     master_file = FRONTEND_DATA_DIR / 'master.json'
-    with open(master_file, 'w') as f:
-        json.dump(master, f, indent=2)
+    dump_json(master, master_file)
     
     print(f"✅ Saved: {master_file.name}")
     